@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Run a synthetic load test of the Kafka consumption path.
+
+Examples:
+    python loadtest.py --scenario sustained --rate 50 --duration 60
+    python loadtest.py --scenario burst --rate 10 --burst-rate 200 --processing-ms 50
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from src.loadtest import LoadProfile, LoadTestRunner, burst, sustained
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Synthetic load test for the unroutable message consumer")
+    parser.add_argument("--scenario", choices=["sustained", "burst"], default="sustained")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to produce for")
+    parser.add_argument("--rate", type=float, default=20.0, help="Messages per second (base rate for bursts)")
+    parser.add_argument("--burst-rate", type=float, default=200.0, help="Messages per second during a burst")
+    parser.add_argument("--burst-seconds", type=float, default=5.0, help="Length of each burst")
+    parser.add_argument("--burst-every", type=float, default=30.0, help="Seconds between burst starts")
+    parser.add_argument("--size-distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--mean-bytes", type=int, default=512)
+    parser.add_argument("--max-bytes", type=int, default=65536)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+    parser.add_argument("--malformed-ratio", type=float, default=0.05)
+    parser.add_argument("--partitions", type=int, default=3)
+    parser.add_argument("--processing-ms", type=float, default=200.0, help="Mean simulated analysis time")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    return parser.parse_args()
+
+
+def main():
+    """Main function."""
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    profile = LoadProfile(
+        size_distribution=args.size_distribution,
+        mean_bytes=args.mean_bytes,
+        max_bytes=args.max_bytes,
+        duplicate_ratio=args.duplicate_ratio,
+        malformed_ratio=args.malformed_ratio,
+        partitions=args.partitions,
+        processing_ms=args.processing_ms,
+        seed=args.seed,
+    )
+
+    if args.scenario == "burst":
+        scenario = burst(args.duration, args.rate, args.burst_rate, args.burst_seconds, args.burst_every)
+    else:
+        scenario = sustained(args.duration, args.rate)
+
+    report = LoadTestRunner(profile, args.sample_interval).run(scenario)
+    output = json.dumps(report.to_dict(), indent=2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,15 @@
 import logging
 import signal
 import sys
+import time
 from typing import Dict, Any
 
 import structlog
 
-from src.config import settings
+from src.config import get_runtime_config, settings
 from src.ai_agent import MessageAnalysisAgent
 from src.kafka_consumer import UnknownTopicMonitor
+from src.tracing import Span, tracer
 from src.web_server import WebServer
 
 # Configure structured logging
@@ -38,9 +40,14 @@ logger = structlog.get_logger()
 class AIAgentService:    
     def __init__(self):
         self.ai_agent = MessageAnalysisAgent()
-        self.kafka_monitor = UnknownTopicMonitor(self._handle_unknown_message)
+        # Digested messages are committed once drained, so send the digest first
+        self.kafka_monitor = UnknownTopicMonitor(
+            self._handle_unknown_message,
+            drain_callback=self.ai_agent.flush_digest
+        )
         self.web_server = WebServer(self)
         self.running = False
+        self.warmup: Dict[str, Any] = {"status": "pending"}
         
         # Set up signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -52,11 +59,44 @@ class AIAgentService:
                    monitored_topic=settings.monitored_topic)
     
     def _signal_handler(self, signum, frame):
-        """Handle shutdown signals."""
-        logger.info(f"Received signal {signum}, shutting down gracefully...")
+        """Handle shutdown signals.
+        
+        Stopping only requests a drain; the consume loop finishes in-flight
+        analyses (bounded by DRAIN_TIMEOUT_SECONDS) and commits their offsets
+        before start() returns.
+        """
+        logger.info(f"Received signal {signum}, draining and shutting down gracefully...")
         self.stop()
     
+    def _record_wait_spans(self, root: Span, metadata: Dict[str, Any]):
+        """Add spans for the time in Kafka and in the scheduler that preceded processing.
+        
+        The broker dwell runs from the record's timestamp until poll() returned
+        it, so it covers consumer lag but not the poll() call's idle wait.
+        """
+        queued_at = root.start_time - metadata.get('queue_wait_ms', 0.0) / 1000
+        produced_at = queued_at - metadata.get('broker_dwell_ms', 0.0) / 1000
+        
+        tracer.record_span("kafka.broker_dwell", root, produced_at, queued_at)
+        tracer.record_span("scheduler.wait", root, queued_at, root.start_time,
+                           {"priority_class": metadata.get('priority_class')})
+        root.start_time = produced_at
+    
     def _handle_unknown_message(self, message_content: str, metadata: Dict[str, Any]):
+        attributes = {
+            "kafka.topic": metadata.get('topic'),
+            "kafka.partition": metadata.get('partition'),
+            "kafka.offset": metadata.get('offset'),
+            "message.bytes": len((message_content or '').encode('utf-8')),
+            "priority_class": metadata.get('priority_class')
+        }
+        
+        with tracer.trace("message.process", attributes) as root:
+            if root is not None:
+                self._record_wait_spans(root, metadata)
+            self._process_unknown_message(message_content, metadata)
+    
+    def _process_unknown_message(self, message_content: str, metadata: Dict[str, Any]):
         try:
             logger.info("Processing unknown message", 
                        topic=metadata.get('topic'),
@@ -85,6 +125,14 @@ class AIAgentService:
             # Start the web server for health checks
             self.web_server.start()
             
+            # Warm up before subscribing so the first message isn't slow
+            self._warm_up()
+            
+            # A signal during the warm-up has already stopped the service
+            if not self.running:
+                logger.info("Stopped during warm-up, not starting the Kafka monitor")
+                return
+            
             # Start monitoring Kafka topics
             self.kafka_monitor.start_monitoring()
             
@@ -96,6 +144,25 @@ class AIAgentService:
             self.stop()
             sys.exit(1)
     
+    def _warm_up(self):
+        """Open connections and prime caches; readiness waits for this."""
+        if not settings.warmup_enabled:
+            self.warmup = {"status": "skipped"}
+            return
+        
+        self.warmup = {"status": "running"}
+        started = time.monotonic()
+        steps = self.ai_agent.warm_up()
+        duration_ms = round(1000 * (time.monotonic() - started), 1)
+        
+        self.warmup = {
+            "status": "complete",
+            "duration_ms": duration_ms,
+            "steps": steps
+        }
+        logger.info("Warm-up complete", duration_ms=duration_ms,
+                   failed_steps=[name for name, step in steps.items() if not step["ok"]])
+    
     def stop(self):
         """Stop the AI Agent service."""
         if self.running:
@@ -114,6 +181,14 @@ class AIAgentService:
             
             logger.info("AI Agent service stopped")
     
+    def readiness_check(self) -> Dict[str, Any]:
+        """Ready once running and the warm-up has finished (or was skipped)."""
+        ready = self.running and self.warmup["status"] in ("complete", "skipped")
+        return {
+            "status": "ready" if ready else "not_ready",
+            "warmup": self.warmup
+        }
+    
     def health_check(self) -> Dict[str, Any]:
         agent_status = self.ai_agent.get_agent_status()
         
@@ -128,7 +203,10 @@ class AIAgentService:
                 "sasl_mechanism": settings.kafka_sasl_mechanism,
                 "consumer_group": settings.consumer_group,
                 "monitored_topic": settings.monitored_topic
-            }
+            },
+            "warmup": self.warmup,
+            "scheduler": self.kafka_monitor.get_stats(),
+            "config": get_runtime_config()
         }
 
 
@@ -2,36 +2,74 @@
 
 import json
 import logging
-from typing import Dict, Any, List
+import threading
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import httpx
 from langchain.agents import AgentType, initialize_agent
 from langchain_openai import OpenAI
 
-from .config import settings
+from .config import Settings, register_settings_listener, settings
+from .fallback import DigestNotifier, send_rule_based_notification
+from .prefetch import prefetcher
+from .prompts import AGENT_PREFIX, DEFAULT_RECIPIENT, PrefixTracker, build_agent_suffix
+from .tiered import FAST_TIER, PRIMARY_TIER, TierStats, create_fast_tier_analyzer, fast_tier_llm_params
+from .tracing import TracingCallbackHandler, tracer
+from .usage import UsageCallbackHandler, usage_tracker
 from .tools.backstage_catalog import create_backstage_catalog_tool
+from .tools.backstage_notification import send_backstage_notification
 from .tools.backstage_notification_tool import create_backstage_notification_tool
 
 logger = logging.getLogger(__name__)
 
+# Stands in for the message when rendering the prompt to find the static prefix
+_INPUT_MARKER = "<<input>>"
+
 
 class MessageAnalysisAgent:
     """AI Agent for analyzing failed message routing and sending notifications."""
     
     def __init__(self):
         """Initialize the AI agent with tools."""
+        # Shared by every model client so the warm-up opens the connection the agent uses
+        self._http_client = httpx.Client()
         self.llm = self._create_llm()
         self.tools = self._create_tools()
-        self.agent = self._create_agent()
-        
-    def _create_llm(self) -> OpenAI:
-        """Create the OpenAI language model."""
-        return OpenAI(
-            model_name=settings.ai_model,
-            temperature=settings.ai_temperature,
-            max_tokens=settings.ai_max_tokens,
-            # This could be replaced if we wanted to use ExternalSecrets
-            openai_api_key="placeholder-key-for-rhoai-without-auth",
-            openai_api_base=settings.inference_server_url
+        self.prefix_tracker = PrefixTracker()
+        self._prompt_lock = threading.Lock()
+        # The catalog groups are added to the prompt once they are loaded
+        self._agent_suffix = build_agent_suffix(None, settings.catalog_max_groups)
+        self.agent = self._create_agent(self._agent_suffix)
+        self.fast_tier = create_fast_tier_analyzer(self._create_llm)
+        self.tier_stats = TierStats()
+        self.digest = DigestNotifier(
+            max_messages=settings.usage_digest_max_messages,
+            max_age_seconds=settings.usage_window_seconds
         )
+        
+        register_settings_listener(self._apply_settings)
+        
+    def _create_llm(self, **overrides: Any) -> OpenAI:
+        """Create the OpenAI language model, with optional parameter overrides."""
+        params: Dict[str, Any] = {
+            "model_name": settings.ai_model,
+            "temperature": settings.ai_temperature,
+            "max_tokens": settings.ai_max_tokens,
+            # This could be replaced if we wanted to use ExternalSecrets
+            "openai_api_key": "placeholder-key-for-rhoai-without-auth",
+            "openai_api_base": settings.inference_server_url,
+            "http_client": self._http_client
+        }
+        params.update(overrides)
+        return OpenAI(**params)
+    
+    def _apply_settings(self, updated: Settings) -> None:
+        """Apply runtime changes to the model parameters and digest."""
+        self.llm.temperature = updated.ai_temperature
+        self.llm.max_tokens = updated.ai_max_tokens
+        self.digest.max_messages = updated.usage_digest_max_messages
+        self.digest.max_age_seconds = updated.usage_window_seconds
     
     def _create_tools(self) -> List:
         tools = []
@@ -44,26 +82,9 @@ class MessageAnalysisAgent:
         
         return tools
     
-    def _create_agent(self):
-        # System message for the agent
-        system_message = """You are an expert system analyst specializing in message routing failure analysis.
-
-Your role is to:
-1. Analyze messages that failed to be routed properly
-2. Identify the likely cause of routing failures
-3. Provide specific recommendations for resolution
-4. Send notifications to relevant teams with your findings
-
-When analyzing messages, consider these common failure causes:
-- Ambiguous intent - message could fit multiple categories
-- Missing context - insufficient information to classify
-- Data format issues - malformed or unexpected structure
-- New content type - content not covered by existing rules
-- Schema validation failures - data doesn't match expected format
-
-Always use the available tools to complete your analysis and send notifications."""
-
-        return initialize_agent(
+    def _create_agent(self, suffix: str):
+        """Create the ReAct agent and record the static prefix of its prompt."""
+        agent = initialize_agent(
             tools=self.tools,
             llm=self.llm,
             agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
@@ -71,31 +92,148 @@ Always use the available tools to complete your analysis and send notifications.
             handle_parsing_errors=True,
             max_iterations=5,
             agent_kwargs={
-                "system_message": system_message
+                "prefix": AGENT_PREFIX,
+                "suffix": suffix
             }
         )
+        
+        # Everything before the per-message input is identical for every run
+        rendered = agent.agent.llm_chain.prompt.format(input=_INPUT_MARKER, agent_scratchpad="")
+        self.prefix_tracker.update(rendered.split(_INPUT_MARKER)[0])
+        return agent
+    
+    def _refresh_prompt(self) -> None:
+        """Rebuild the agent if the catalog groups in its static prompt changed.
+        
+        Never waits for the catalog: it uses the last fetched groups and the
+        cache refreshes them in the background, so a changed list reaches
+        the prompt on a later message.
+        """
+        groups = self._catalog_groups()
+        if groups is None:
+            return
+        
+        suffix = build_agent_suffix(groups, settings.catalog_max_groups)
+        with self._prompt_lock:
+            if suffix == self._agent_suffix:
+                return
+            self.agent = self._create_agent(suffix)
+            self._agent_suffix = suffix
+            logger.info(f"Agent prompt prefix changed, now {self.prefix_tracker.prefix_hash[:12]}")
+    
+    def _snapshot_agent(self) -> Tuple[Any, str, int]:
+        """Return the current agent with its prompt prefix's hash and length, recording a run.
+        
+        All are read under the prompt lock, so a rebuild by another worker
+        can't pair one prompt with the other prompt's prefix.
+        """
+        with self._prompt_lock:
+            return self.agent, self.prefix_tracker.record_use(), len(self.prefix_tracker.prefix)
+    
+    def _catalog_tool(self):
+        """Return the catalog tool, or None if the agent doesn't have one."""
+        for tool in self.tools:
+            if hasattr(tool, "cached_groups"):
+                return tool
+        return None
+    
+    def _catalog_groups(self) -> Optional[List[Dict[str, str]]]:
+        """Return the last fetched catalog groups without blocking, if any."""
+        catalog_tool = self._catalog_tool()
+        return catalog_tool.cached_groups() if catalog_tool is not None else None
+    
+    def warm_up(self) -> Dict[str, Any]:
+        """Open connections and prime caches before the first message arrives.
+        
+        Preloads the catalog group list (opening the pooled Backstage
+        connection), builds the agent prompt with it and sends a one-token
+        completion with the static prompt prefix, so the inference server
+        connection is open and the prefix is in its KV cache. With the fast
+        tier enabled, its model is primed the same way with its own static
+        instructions. Failures are reported, not raised.
+        
+        Returns:
+            Dict[str, Any]: Outcome and duration of each warm-up step
+        """
+        def preload_catalog() -> None:
+            catalog_tool = self._catalog_tool()
+            if catalog_tool is not None:
+                catalog_tool.fetch_groups()
+        
+        def compile_prompt() -> None:
+            self._refresh_prompt()
+            self.agent.agent.llm_chain.prompt.format(input="", agent_scratchpad="")
+        
+        # Fail fast rather than holding readiness for the client's default timeout and retries
+        warm_up_overrides = {
+            "max_tokens": 1,
+            "timeout": settings.warmup_timeout_seconds,
+            "max_retries": 0
+        }
+        
+        def prime_inference() -> None:
+            warm_up_llm = self._create_llm(**warm_up_overrides)
+            warm_up_llm.invoke(self.prefix_tracker.prefix)
+        
+        def prime_fast_inference() -> None:
+            warm_up_llm = self._create_llm(**{**fast_tier_llm_params(), **warm_up_overrides})
+            warm_up_llm.invoke(self.fast_tier.build_instructions(self._catalog_groups() or []))
+        
+        steps = {
+            "catalog": self._run_warm_up_step(preload_catalog),
+            "prompt_template": self._run_warm_up_step(compile_prompt),
+            "inference": self._run_warm_up_step(prime_inference)
+        }
+        if self.fast_tier is not None:
+            steps["fast_inference"] = self._run_warm_up_step(prime_fast_inference)
+        return steps
+    
+    @staticmethod
+    def _run_warm_up_step(step: Callable[[], None]) -> Dict[str, Any]:
+        """Run a warm-up step, timing it and capturing any error."""
+        started = time.monotonic()
+        try:
+            step()
+            result: Dict[str, Any] = {"ok": True}
+        except Exception as e:
+            logger.warning(f"Warm-up step {step.__name__} failed: {e}")
+            result = {"ok": False, "error": str(e)}
+        result["duration_ms"] = round(1000 * (time.monotonic() - started), 1)
+        return result
     
     def process_unknown_message(self, message_content: str, metadata: Dict[str, Any]) -> None:
+        topic = metadata.get('topic') or ""
+        if not usage_tracker.within_budget(topic):
+            self._handle_over_budget(message_content, metadata)
+            return
+        
+        # Budget is available again, so send anything collected while it wasn't
+        if len(self.digest):
+            self.digest.flush()
+        
+        usage = UsageCallbackHandler(topic)
         try:
             logger.info(f"Processing unknown message: {message_content[:100]}...")
             
-            # Create a simple, focused prompt for the agent
-            headers_json = json.dumps(metadata.get('headers', {}), indent=2)
+            if self.fast_tier is not None and self._try_fast_tier(message_content, metadata, usage):
+                return
+            
+            with tracer.span("prompt.build") as span:
+                self._refresh_prompt()
+                agent, prefix_hash, prefix_chars = self._snapshot_agent()
+                input = self._build_prompt(message_content, metadata)
+                if span is not None:
+                    span.set_attribute("prompt.chars", len(input))
+                    span.set_attribute("prompt.prefix_sha256", prefix_hash)
+                    span.set_attribute("prompt.prefix_chars", prefix_chars)
             
-            # Simple prompt that focuses on the task
-            input = f"""Analyze this failed message that failed to be routed properly, and generate a one sentence summary of the likely cause of the routing failure.
-
-Message: {message_content}
-
-Metadata: Topic={metadata.get('topic')}, Partition={metadata.get('partition')}, Offset={metadata.get('offset')}
-
-Headers: {headers_json}
-
-Always send a notification containing your analysis summary to the group:default/rhdh entity, as well as the other entity you deem relevant."""
-
             logger.info(f"Input prompt: {input}")
             # Use the agent to analyze the message and send notification
-            result = self.agent.run(input)
+            started = time.monotonic()
+            with tracer.span("agent.run"), prefetcher.scope():
+                self._start_prefetches()
+                result = agent.run(input, callbacks=[TracingCallbackHandler(tracer), usage])
+            self.tier_stats.record(PRIMARY_TIER, time.monotonic() - started)
             
             logger.info(f"Agent completed analysis and notification: {result}")
             
@@ -104,7 +242,6 @@ Always send a notification containing your analysis summary to the group:default
             
             # Send a fallback notification directly if agent fails completely
             try:
-                from .tools.backstage_notification import send_backstage_notification
                 title = "AI Agent Error"
                 description = f"""The AI agent encountered an error while analyzing a failed message:
 
@@ -121,6 +258,112 @@ Please investigate this message routing failure manually."""
                 send_backstage_notification(title, description)
             except Exception as notification_error:
                 logger.error(f"Failed to send fallback notification: {notification_error}")
+        finally:
+            usage_tracker.record(usage.usage)
+    
+    def _try_fast_tier(self, message_content: str, metadata: Dict[str, Any], usage: UsageCallbackHandler) -> bool:
+        """Analyze a message with the fast model and notify if it is confident.
+        
+        Returns:
+            bool: True if the fast tier handled the message, False to escalate
+        """
+        groups = self._catalog_groups() or []
+        started = time.monotonic()
+        with tracer.span("tier.fast") as span:
+            result, reason = self.fast_tier.analyze(
+                message_content, metadata, groups,
+                callbacks=[TracingCallbackHandler(tracer), usage]
+            )
+            if span is not None:
+                span.set_attribute("tier.escalated", result is None)
+                if reason:
+                    span.set_attribute("tier.escalation_reason", reason)
+        self.tier_stats.record(FAST_TIER, time.monotonic() - started)
+        
+        if result is None:
+            self.tier_stats.record_escalation(reason)
+            return False
+        
+        description = f"""{result.summary}
+
+**Metadata:**
+- Topic: {metadata.get('topic')}
+- Partition: {metadata.get('partition')}
+- Offset: {metadata.get('offset')}
+- Timestamp: {metadata.get('timestamp')}
+
+Analyzed by {settings.ai_fast_model} with confidence {result.confidence:.2f}."""
+        
+        # Send failures are returned, not raised; without the default notification
+        # the message isn't handled, so let the agent (and its fallback) take it
+        status = send_backstage_notification(settings.notification_title, description, DEFAULT_RECIPIENT)
+        if status.startswith("Error:"):
+            logger.warning(f"Fast tier notification failed, escalating: {status}")
+            self.tier_stats.record_escalation("notification_failed")
+            return False
+        usage.usage.recipients.append(DEFAULT_RECIPIENT)
+        
+        if result.recipient and result.recipient != DEFAULT_RECIPIENT:
+            status = send_backstage_notification(settings.notification_title, description, result.recipient)
+            if status.startswith("Error:"):
+                logger.error(f"Fast tier notification to {result.recipient} failed: {status}")
+            else:
+                usage.usage.recipients.append(result.recipient)
+        
+        self.tier_stats.record_resolved()
+        logger.info(f"Fast tier handled message at offset {metadata.get('offset')}: {result.summary}")
+        return True
+    
+    def _start_prefetches(self) -> None:
+        """Speculatively start tool calls the agent is likely to make.
+        
+        These overlap with the first LLM call; results the agent doesn't ask
+        for are discarded when the run ends.
+        """
+        if not settings.prefetch_enabled:
+            return
+        
+        for tool in self.tools:
+            if hasattr(tool, "prefetch"):
+                tool.prefetch()
+    
+    def flush_digest(self) -> None:
+        """Send any collected over-budget digest now, e.g. before a drain commits offsets."""
+        if len(self.digest):
+            logger.info(f"Sending digest of {len(self.digest)} message(s) before draining")
+            if not self.digest.flush():
+                logger.error("Digest could not be sent before draining; it will be lost if the service stops")
+    
+    def _handle_over_budget(self, message_content: str, metadata: Dict[str, Any]) -> None:
+        """Analyze a message without the LLM because the token budget is used up."""
+        logger.warning(f"Token budget exhausted, using {settings.usage_budget_fallback} handling "
+                       f"for offset {metadata.get('offset')}")
+        try:
+            if settings.usage_budget_fallback == "digest":
+                self.digest.add(message_content, metadata)
+            else:
+                send_rule_based_notification(message_content, metadata, "the AI token budget is exhausted")
+        except Exception as e:
+            logger.error(f"Error handling over-budget message: {e}", exc_info=True)
+    
+    def _build_prompt(self, message_content: str, metadata: Dict[str, Any]) -> str:
+        """Build the per-message agent input.
+        
+        The task instructions are part of the static prompt prefix, so this
+        only contains what changes from one message to the next.
+        """
+        # Kafka header values are bytes; sort them so equal headers render identically
+        headers = {
+            name: value.decode("utf-8", errors="replace") if isinstance(value, bytes) else value
+            for name, value in (metadata.get('headers') or {}).items()
+        }
+        headers_json = json.dumps(headers, indent=2, sort_keys=True)
+        
+        return f"""Message: {message_content}
+
+Metadata: Topic={metadata.get('topic')}, Partition={metadata.get('partition')}, Offset={metadata.get('offset')}
+
+Headers: {headers_json}"""
     
     def get_agent_status(self) -> Dict[str, Any]:
         """Get the current status of the agent."""
@@ -131,5 +374,14 @@ Please investigate this message routing failure manually."""
             "max_tokens": settings.ai_max_tokens,
             "tools_count": len(self.tools),
             "service_name": settings.service_name,
-            "available_tools": [tool.name for tool in self.tools]
+            "available_tools": [tool.name for tool in self.tools],
+            "usage": usage_tracker.get_stats(),
+            "prefetch": prefetcher.get_stats(),
+            "prompt_prefix": self.prefix_tracker.get_stats(),
+            "tiers": {
+                "enabled": self.fast_tier is not None,
+                "fast_model": settings.ai_fast_model or None,
+                "confidence_threshold": settings.ai_tier_confidence_threshold,
+                **self.tier_stats.get_stats()
+            }
         }
\ No newline at end of file
@@ -1,9 +1,13 @@
 """Configuration settings for the AI Agent."""
 
+import logging
 import os
-from typing import List
+import threading
+from typing import Any, Callable, Dict, List, Literal
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, field_validator
+
+logger = logging.getLogger(__name__)
 
 
 class Settings(BaseSettings):
@@ -50,6 +54,85 @@ class Settings(BaseSettings):
         default="latest", 
         description="Kafka consumer offset reset strategy"
     )
+    kafka_poll_timeout_ms: int = Field(
+        default=1000, ge=1, le=60000,
+        description="Maximum time a single poll() waits for records"
+    )
+    kafka_max_poll_records: int = Field(
+        default=500, ge=1, le=10000,
+        description="Maximum number of records returned by a single poll()"
+    )
+    kafka_fetch_min_bytes: int = Field(
+        default=1,
+        description="Minimum data the broker returns for a fetch request"
+    )
+    kafka_fetch_max_wait_ms: int = Field(
+        default=500,
+        description="Maximum time the broker waits to satisfy fetch_min_bytes"
+    )
+    kafka_max_partition_fetch_bytes: int = Field(
+        default=1048576,
+        description="Maximum data returned per partition in a fetch response"
+    )
+    kafka_session_timeout_ms: int = Field(
+        default=10000,
+        description="Consumer group session timeout"
+    )
+    kafka_heartbeat_interval_ms: int = Field(
+        default=3000,
+        description="Consumer group heartbeat interval"
+    )
+    kafka_max_poll_interval_ms: int = Field(
+        default=300000,
+        description="Maximum delay between polls before the consumer leaves the group"
+    )
+    
+    drain_timeout_seconds: float = Field(
+        default=25.0, ge=0, le=600,
+        description="Maximum time to wait for in-flight analyses on shutdown or rebalance"
+    )
+    
+    # Scheduling Configuration
+    scheduler_workers: int = Field(
+        default=1, ge=1, le=64,
+        description="Number of worker threads analyzing scheduled messages"
+    )
+    scheduler_priority_functions: str = Field(
+        default="header_severity,source_service,key_prefix,message_age",
+        description="Comma-separated priority functions, evaluated in order"
+    )
+    scheduler_class_weights: str = Field(
+        default="critical=8,high=4,normal=2,low=1",
+        description="Comma-separated priority classes and their weighted fair queuing weights"
+    )
+    scheduler_severity_header: str = Field(
+        default="severity",
+        description="Message header holding the severity used by header_severity"
+    )
+    scheduler_source_header: str = Field(
+        default="source",
+        description="Message header holding the originating service used by source_service"
+    )
+    scheduler_source_classes: str = Field(
+        default="",
+        description="Comma-separated service=class pairs used by source_service"
+    )
+    scheduler_key_prefix_classes: str = Field(
+        default="",
+        description="Comma-separated key-prefix=class pairs used by key_prefix"
+    )
+    scheduler_stale_after_seconds: float = Field(
+        default=3600.0,
+        description="Message age after which message_age demotes it to the low class (0 disables)"
+    )
+    scheduler_max_wait_seconds: float = Field(
+        default=300.0, ge=0, le=86400,
+        description="Queue wait after which a message is served ahead of higher classes"
+    )
+    scheduler_max_queue_size: int = Field(
+        default=1000, ge=1, le=100000,
+        description="Maximum number of queued messages before consumption pauses"
+    )
     
     # AI Configuration
     ai_model: str = Field(
@@ -61,8 +144,75 @@ class Settings(BaseSettings):
         description="Inference server URL for the AI model"
     )
 
-    ai_temperature: float = Field(default=0.3, description="AI model temperature")
-    ai_max_tokens: int = Field(default=500, description="Maximum tokens for AI response")
+    ai_temperature: float = Field(default=0.3, ge=0.0, le=2.0, description="AI model temperature")
+    ai_max_tokens: int = Field(default=500, ge=1, le=16384, description="Maximum tokens for AI response")
+    warmup_enabled: bool = Field(
+        default=True,
+        description="Warm up inference, catalog and Backstage connections before consuming"
+    )
+    warmup_timeout_seconds: float = Field(
+        default=10.0, ge=1, le=300,
+        description="Timeout of the warm-up inference request, which is not retried"
+    )
+    prefetch_enabled: bool = Field(
+        default=True,
+        description="Speculatively fetch catalog groups while the first LLM call runs"
+    )
+    ai_tiered_enabled: bool = Field(
+        default=False,
+        description="Try a small fast model first and escalate to the agent when it is unsure"
+    )
+    ai_fast_model: str = Field(default="", description="Model used for the fast tier")
+    ai_fast_inference_server_url: str = Field(
+        default="",
+        description="Inference server URL for the fast tier model (defaults to inference_server_url)"
+    )
+    ai_fast_max_tokens: int = Field(default=200, ge=1, le=16384, description="Maximum tokens for the fast tier response")
+    ai_tier_confidence_threshold: float = Field(
+        default=0.7, ge=0.0, le=1.0,
+        description="Minimum fast tier confidence to accept its answer without escalating"
+    )
+    
+    # Usage and Budget Configuration
+    usage_window_seconds: int = Field(
+        default=3600, ge=1, le=604800,
+        description="Length of the rolling window for token usage totals and budgets"
+    )
+    usage_token_budget_per_window: int = Field(
+        default=0, ge=0, le=1_000_000_000,
+        description="Maximum LLM tokens across all topics per window (0 for unlimited)"
+    )
+    usage_topic_token_budget_per_window: int = Field(
+        default=0, ge=0, le=1_000_000_000,
+        description="Maximum LLM tokens for a single topic per window (0 for unlimited)"
+    )
+    usage_budget_fallback: Literal["rule_based", "digest"] = Field(
+        default="rule_based",
+        description="Handling once a budget is exhausted: rule_based or digest"
+    )
+    usage_digest_max_messages: int = Field(
+        default=20, ge=1, le=1000,
+        description="Number of over-budget messages collected before a digest is sent"
+    )
+    
+    # Tracing Configuration
+    tracing_enabled: bool = Field(default=True, description="Record per-stage tracing spans")
+    tracing_sample_rate: float = Field(
+        default=1.0, ge=0.0, le=1.0,
+        description="Fraction of messages traced (0.0-1.0)"
+    )
+    tracing_buffer_size: int = Field(
+        default=200, ge=0, le=100000,
+        description="Number of recent traces kept for /traces"
+    )
+    tracing_slow_trace_count: int = Field(
+        default=20, ge=0, le=10000,
+        description="Number of slowest traces kept for /traces/slow"
+    )
+    tracing_otlp_file: str = Field(
+        default="",
+        description="Optional file to append traces to as OTLP/JSON lines"
+    )
     
     # Backstage Configuration
     backstage_api_url: str = Field(
@@ -73,6 +223,22 @@ class Settings(BaseSettings):
         default="", 
         description="Backstage API authentication token"
     )
+    catalog_page_size: int = Field(
+        default=200, ge=1, le=1000,
+        description="Groups requested per Backstage Catalog page"
+    )
+    catalog_max_groups: int = Field(
+        default=25, ge=1, le=500,
+        description="Maximum number of groups returned to the agent by the catalog tool"
+    )
+    catalog_cache_ttl_seconds: float = Field(
+        default=300.0, ge=0, le=86400,
+        description="How long the catalog group list is cached (0 disables caching)"
+    )
+    catalog_failure_backoff_seconds: float = Field(
+        default=30.0, ge=0, le=3600,
+        description="How long a failed catalog fetch is remembered before it is retried"
+    )
     notification_title: str = Field(
         default="Message Routing Failure Detected", 
         description="Default notification title"
@@ -84,16 +250,143 @@ class Settings(BaseSettings):
     
     # Health and Monitoring
     health_check_port: int = Field(default=8080, description="Health check server port")
+    admin_token: str = Field(
+        default="",
+        description="Bearer token required by PUT /config (empty disables runtime changes)"
+    )
     
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
 
+    @field_validator("scheduler_class_weights")
+    @classmethod
+    def _validate_class_weights(cls, value: str) -> str:
+        for name, weight in _parse_pairs(value).items():
+            if not weight.isdigit() or int(weight) < 1:
+                raise ValueError(f"weight for class '{name}' must be a positive integer")
+        return value
+
     @property
     def kafka_broker_list(self) -> List[str]:
         """Return Kafka broker as a list for compatibility."""
         return [self.kafka_broker]
 
+    @property
+    def scheduler_priority_function_list(self) -> List[str]:
+        """Return the configured priority function names as a list."""
+        return [name.strip() for name in self.scheduler_priority_functions.split(",") if name.strip()]
+
+    @property
+    def scheduler_class_weight_map(self) -> Dict[str, int]:
+        """Return the priority class weights as a dictionary."""
+        return {name: int(weight) for name, weight in _parse_pairs(self.scheduler_class_weights).items()}
+
+    @property
+    def scheduler_source_class_map(self) -> Dict[str, str]:
+        """Return the source service to priority class mapping."""
+        return {name.lower(): value for name, value in _parse_pairs(self.scheduler_source_classes).items()}
+
+    @property
+    def scheduler_key_prefix_class_map(self) -> Dict[str, str]:
+        """Return the key prefix to priority class mapping."""
+        return _parse_pairs(self.scheduler_key_prefix_classes)
+
+
+def _parse_pairs(value: str) -> Dict[str, str]:
+    """Parse a comma-separated list of name=value pairs."""
+    pairs = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        name, _, pair_value = item.partition("=")
+        if name.strip():
+            pairs[name.strip()] = pair_value.strip()
+    return pairs
+
+
+# Settings that can be changed in the running process through PUT /config.
+# Anything read only when a component is created (e.g. Kafka connection and
+# fetch settings) is deliberately left out.
+RUNTIME_TUNABLE_FIELDS = (
+    "ai_temperature",
+    "ai_max_tokens",
+    "ai_tier_confidence_threshold",
+    "kafka_poll_timeout_ms",
+    "kafka_max_poll_records",
+    "drain_timeout_seconds",
+    "scheduler_workers",
+    "scheduler_class_weights",
+    "scheduler_max_wait_seconds",
+    "scheduler_max_queue_size",
+    "prefetch_enabled",
+    "usage_window_seconds",
+    "usage_token_budget_per_window",
+    "usage_topic_token_budget_per_window",
+    "usage_budget_fallback",
+    "usage_digest_max_messages",
+    "tracing_enabled",
+    "tracing_sample_rate",
+    "catalog_page_size",
+    "catalog_max_groups",
+    "catalog_cache_ttl_seconds",
+    "catalog_failure_backoff_seconds",
+)
+
+_update_lock = threading.Lock()
+_listeners: List[Callable[["Settings"], None]] = []
+
+
+def register_settings_listener(listener: Callable[["Settings"], None]) -> None:
+    """Register a function called with the settings after each runtime update.
+    
+    Components that copy a setting when they are created use this to pick up
+    the new value.
+    """
+    _listeners.append(listener)
+
+
+def get_runtime_config() -> Dict[str, Any]:
+    """Return the effective values of the runtime-tunable settings."""
+    return {name: getattr(settings, name) for name in RUNTIME_TUNABLE_FIELDS}
+
+
+def update_settings(changes: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate and apply runtime setting changes atomically.
+    
+    All changes are validated together by the Settings model before any is
+    applied, and the new values replace the old ones in a single step.
+    
+    Args:
+        changes: Setting names mapped to their new values
+        
+    Returns:
+        Dict[str, Any]: The effective runtime-tunable settings
+        
+    Raises:
+        ValueError: If a setting is unknown, not tunable or fails validation
+    """
+    not_tunable = sorted(set(changes) - set(RUNTIME_TUNABLE_FIELDS))
+    if not_tunable:
+        raise ValueError(f"Settings cannot be changed at runtime: {', '.join(not_tunable)}")
+    
+    with _update_lock:
+        # Pass every field explicitly so validation doesn't re-read the environment
+        updated = Settings(**{**settings.model_dump(), **changes})
+        
+        # Swapping the attribute dictionary is a single reference assignment,
+        # so readers see either all of the old values or all of the new ones
+        object.__setattr__(settings, "__dict__", updated.__dict__)
+        
+        for listener in _listeners:
+            try:
+                listener(settings)
+            except Exception as e:
+                # Settings are already applied; a failing listener shouldn't undo them
+                logger.error(f"Settings listener failed: {e}", exc_info=True)
+    
+    return get_runtime_config()
+
 
 # Global settings instance
 settings = Settings() 
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""Rule-based analysis and digest notifications used when the LLM is unavailable."""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from .tools.backstage_notification import send_backstage_notification
+
+logger = logging.getLogger(__name__)
+
+# Payload fields that routing rules usually key on
+ROUTING_FIELDS = ("type", "event", "event_type", "category", "intent", "kind")
+
+# Delay before sending a digest again after Backstage rejected it
+DIGEST_RETRY_SECONDS = 60.0
+
+
+def analyze_without_llm(message_content: str) -> str:
+    """Return a one sentence likely cause of a routing failure using simple rules."""
+    if not message_content or not message_content.strip():
+        return "Missing context - the message body is empty."
+
+    try:
+        payload = json.loads(message_content)
+    except ValueError:
+        if message_content.lstrip().startswith(("{", "[")):
+            return "Data format issue - the payload looks like JSON but could not be parsed."
+        return "Ambiguous intent - the free text payload could not be classified by the existing rules."
+
+    if not isinstance(payload, dict):
+        return "Data format issue - the payload is JSON but not an object."
+
+    for name in ROUTING_FIELDS:
+        if payload.get(name):
+            return f"New content type - the {name} '{payload[name]}' is not covered by the existing routing rules."
+
+    return "Missing context - the JSON payload has no type or category field to route on."
+
+
+def _format_metadata(metadata: Dict[str, Any]) -> str:
+    return (
+        f"- Topic: {metadata.get('topic')}\n"
+        f"- Partition: {metadata.get('partition')}\n"
+        f"- Offset: {metadata.get('offset')}\n"
+        f"- Timestamp: {metadata.get('timestamp')}"
+    )
+
+
+def send_rule_based_notification(message_content: str, metadata: Dict[str, Any], reason: str) -> str:
+    """Send a notification with a rule-based analysis of a single message."""
+    cause = analyze_without_llm(message_content)
+    title = f"{settings.notification_title} (rule-based)"
+    description = f"""{cause}
+
+This message was analyzed with rule-based heuristics because {reason}.
+
+**Metadata:**
+{_format_metadata(metadata)}"""
+
+    return send_backstage_notification(title, description)
+
+
+class DigestNotifier:
+    """Collects rule-based analyses and sends them as a single notification.
+    
+    The digest is sent once it is full, or by a timer once its oldest entry
+    is ``max_age_seconds`` old, even if no further messages arrive. If the
+    notification fails, the entries are kept and sent again after
+    ``DIGEST_RETRY_SECONDS``.
+    """
+
+    def __init__(self, max_messages: int, max_age_seconds: float):
+        """Initialize the digest.
+
+        Args:
+            max_messages: Number of entries that triggers sending the digest
+            max_age_seconds: Age of the oldest entry that triggers sending the digest
+        """
+        self.max_messages = max_messages
+        self.max_age_seconds = max_age_seconds
+        self._entries: List[str] = []
+        self._first_added = 0.0
+        self._retry_after = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def add(self, message_content: str, metadata: Dict[str, Any]) -> None:
+        """Add a message to the digest, sending it if it is full or old enough."""
+        entry = (
+            f"- {metadata.get('topic')}[{metadata.get('partition')}]@{metadata.get('offset')}: "
+            f"{analyze_without_llm(message_content)}"
+        )
+
+        with self._lock:
+            if not self._entries:
+                self._first_added = time.time()
+                self._schedule(self.max_age_seconds)
+            self._entries.append(entry)
+            due = (
+                len(self._entries) >= self.max_messages
+                or time.time() - self._first_added >= self.max_age_seconds
+            ) and time.time() >= self._retry_after
+
+        if due:
+            self.flush()
+
+    def _schedule(self, delay: float) -> None:
+        """Start the timer that sends an old digest. Must be called with the lock held."""
+        self._timer = threading.Timer(max(0.0, delay), self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            if not self._entries:
+                return
+            # max_age_seconds may have been raised at runtime since scheduling
+            remaining = self._first_added + self.max_age_seconds - time.time()
+            if remaining > 0:
+                self._schedule(remaining)
+                return
+        
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error sending digest: {e}", exc_info=True)
+    
+    def flush(self) -> bool:
+        """Send the collected entries, if any.
+
+        Returns:
+            bool: False if the notification failed; the entries are kept to send again
+        """
+        with self._lock:
+            entries, self._entries = self._entries, []
+            first_added = self._first_added
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if not entries:
+            return True
+
+        logger.info(f"Sending digest of {len(entries)} message(s)")
+        title = f"{settings.notification_title} (digest of {len(entries)})"
+        description = "The following messages were analyzed with rule-based heuristics:\n\n" + "\n".join(entries)
+        status = send_backstage_notification(title, description)
+        if not status.startswith("Error:"):
+            return True
+
+        # The messages are already committed, so the digest is their only record
+        logger.error(f"Failed to send digest of {len(entries)} message(s), retrying in "
+                     f"{DIGEST_RETRY_SECONDS:.0f}s: {status}")
+        with self._lock:
+            self._entries = entries + self._entries
+            self._first_added = first_added
+            self._retry_after = time.time() + DIGEST_RETRY_SECONDS
+            if self._timer is not None:
+                self._timer.cancel()
+            self._schedule(DIGEST_RETRY_SECONDS)
+        return False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -2,12 +2,16 @@
 
 import json
 import logging
-from typing import Dict, Any, Optional, Callable, List
+import threading
+import time
+from typing import Dict, Any, Optional, Callable, List, Set, Tuple
 from dataclasses import dataclass
-from kafka import KafkaConsumer
+from kafka import ConsumerRebalanceListener, KafkaConsumer, TopicPartition
 from kafka.errors import KafkaError
+from kafka.structs import OffsetAndMetadata
 
-from .config import settings
+from .config import Settings, register_settings_listener, settings
+from .scheduler import PriorityScheduler, ScheduledMessage, create_priority_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -23,20 +27,185 @@ class KafkaMessage:
     value: str
     timestamp: int
     headers: Dict[str, Any]
+    broker_dwell_ms: float = 0.0
+
+
+# Partitions are identified by (topic, partition); kafka-python's TopicPartition
+# is a namedtuple so it compares equal to these keys.
+PartitionKey = Tuple[str, int]
+
+
+class OffsetTracker:
+    """Tracks which received offsets have been fully processed.
+    
+    Messages may finish out of order once they are scheduled by priority, so
+    the committable offset for a partition is the lowest offset that has not
+    finished yet. Everything below it has been processed exactly once.
+    """
+    
+    def __init__(self):
+        """Initialize the offset tracker."""
+        self._condition = threading.Condition()
+        self._pending: Dict[PartitionKey, Set[int]] = {}
+        self._next_offset: Dict[PartitionKey, int] = {}
+        self._committed: Dict[PartitionKey, int] = {}
+        # ids of the message objects being processed, so a message that was
+        # still in flight when its partition was forgotten can't complete a
+        # redelivered copy of itself
+        self._active: Dict[PartitionKey, Set[int]] = {}
+    
+    def track(self, message: KafkaMessage) -> None:
+        """Record that a message was received and has not been processed yet."""
+        key = (message.topic, message.partition)
+        with self._condition:
+            self._pending.setdefault(key, set()).add(message.offset)
+            self._next_offset[key] = max(self._next_offset.get(key, 0), message.offset + 1)
+    
+    def started(self, message: KafkaMessage) -> bool:
+        """Record that processing of a message has begun.
+        
+        Returns:
+            bool: False if the message's partition was revoked and it should be skipped
+        """
+        key = (message.topic, message.partition)
+        with self._condition:
+            if message.offset not in self._pending.get(key, ()):
+                return False
+            self._active.setdefault(key, set()).add(id(message))
+            return True
+    
+    def completed(self, message: KafkaMessage) -> None:
+        """Record that a message has been processed and may be committed.
+        
+        Ignored if the message's partition was forgotten while it was in flight.
+        """
+        key = (message.topic, message.partition)
+        with self._condition:
+            active = self._active.get(key)
+            if active is None or id(message) not in active:
+                return
+            active.discard(id(message))
+            self._pending[key].discard(message.offset)
+            self._condition.notify_all()
+    
+    def committable(self, partitions: Optional[List[PartitionKey]] = None,
+                    include_unchanged: bool = False) -> Dict[PartitionKey, int]:
+        """Return the offsets that can be committed.
+        
+        Args:
+            partitions: Partitions to include, or None for all tracked partitions
+            include_unchanged: Also return offsets equal to the last acknowledged commit
+        """
+        with self._condition:
+            offsets = {}
+            for key, next_offset in self._next_offset.items():
+                if partitions is not None and key not in partitions:
+                    continue
+                pending = self._pending.get(key)
+                offset = min(pending) if pending else next_offset
+                if include_unchanged or self._committed.get(key) != offset:
+                    offsets[key] = offset
+            return offsets
+    
+    def mark_committed(self, offsets: Dict[PartitionKey, int]) -> None:
+        """Record offsets that Kafka acknowledged as committed."""
+        with self._condition:
+            for key, offset in offsets.items():
+                # Only for partitions still assigned; a late acknowledgement
+                # must not resurrect state that forget() dropped
+                if key in self._next_offset:
+                    self._committed[key] = offset
+    
+    def forget(self, partitions: List[PartitionKey]) -> None:
+        """Drop all state for partitions that are no longer assigned."""
+        with self._condition:
+            for key in partitions:
+                key = tuple(key)
+                self._pending.pop(key, None)
+                self._next_offset.pop(key, None)
+                self._committed.pop(key, None)
+                self._active.pop(key, None)
+    
+    def wait_until_idle(self, partitions: Optional[List[PartitionKey]] = None,
+                        timeout: Optional[float] = None) -> bool:
+        """Wait until no message from the given partitions is being processed.
+        
+        Returns:
+            bool: False if the timeout expired with processing still in flight
+        """
+        def idle() -> bool:
+            return not any(
+                active for key, active in self._active.items()
+                if partitions is None or key in partitions
+            )
+        
+        with self._condition:
+            return self._condition.wait_for(idle, timeout)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return counts of pending and in-flight offsets."""
+        with self._condition:
+            return {
+                "pending": sum(len(offsets) for offsets in self._pending.values()),
+                "in_flight": sum(len(active) for active in self._active.values()),
+                "committed": {f"{topic}-{partition}": offset for (topic, partition), offset in self._committed.items()}
+            }
+
+
+def _offset_and_metadata(offset: int) -> OffsetAndMetadata:
+    """Build an OffsetAndMetadata across kafka-python versions."""
+    # kafka-python 2.1 added leader_epoch to the tuple
+    if len(OffsetAndMetadata._fields) == 3:
+        return OffsetAndMetadata(offset, "", -1)
+    return OffsetAndMetadata(offset, "")
+
+
+class _RebalanceListener(ConsumerRebalanceListener):
+    """Checkpoints processed offsets before partitions move to another consumer."""
+    
+    def __init__(self, processor: "MessageProcessor"):
+        self.processor = processor
+    
+    def on_partitions_revoked(self, revoked):
+        self.processor.handle_revoked_partitions([(tp.topic, tp.partition) for tp in revoked])
+    
+    def on_partitions_assigned(self, assigned):
+        logger.info(f"Assigned partitions: {[f'{tp.topic}-{tp.partition}' for tp in assigned]}")
 
 
 class MessageProcessor:
-    """Handles processing of Kafka messages."""
+    """Handles processing of Kafka messages in batches."""
     
-    def __init__(self, message_handler: Callable[[KafkaMessage], None]):
+    def __init__(
+        self,
+        batch_handler: Callable[[List[KafkaMessage]], None],
+        drain_handler: Optional[Callable[[Optional[List[PartitionKey]]], None]] = None,
+        consumer_factory: Optional[Callable[..., KafkaConsumer]] = None,
+        backpressure_handler: Optional[Callable[[bool], bool]] = None
+    ):
         """Initialize the message processor.
         
+        Offsets are committed manually: only messages marked completed in
+        offset_tracker are committed, so nothing is lost or reprocessed across
+        restarts and rebalances.
+        
         Args:
-            message_handler: Function to call when a message is received
+            batch_handler: Function to call with each batch of received messages
+            drain_handler: Function called with the partitions being given up
+                (None for all) to finish in-flight work before offsets are committed
+            consumer_factory: Called with the consumer config to create the
+                consumer; defaults to KafkaConsumer (load tests pass a fake)
+            backpressure_handler: Called with whether consumption is currently
+                paused; returns whether it should be paused
         """
-        self.message_handler = message_handler
+        self.batch_handler = batch_handler
+        self.drain_handler = drain_handler
+        self.consumer_factory = consumer_factory or KafkaConsumer
+        self.backpressure_handler = backpressure_handler
+        self.offset_tracker = OffsetTracker()
         self.consumer: Optional[KafkaConsumer] = None
         self.running = False
+        self.paused = False
     
     def create_consumer(self) -> KafkaConsumer:
         """Create and configure the Kafka consumer."""
@@ -44,8 +213,14 @@ class MessageProcessor:
             'bootstrap_servers': settings.kafka_broker_list,
             'group_id': settings.consumer_group,
             'auto_offset_reset': settings.kafka_auto_offset_reset,
-            'enable_auto_commit': True,
-            'auto_commit_interval_ms': 1000,
+            'enable_auto_commit': False,
+            'fetch_min_bytes': settings.kafka_fetch_min_bytes,
+            'fetch_max_wait_ms': settings.kafka_fetch_max_wait_ms,
+            'max_poll_records': settings.kafka_max_poll_records,
+            'max_partition_fetch_bytes': settings.kafka_max_partition_fetch_bytes,
+            'session_timeout_ms': settings.kafka_session_timeout_ms,
+            'heartbeat_interval_ms': settings.kafka_heartbeat_interval_ms,
+            'max_poll_interval_ms': settings.kafka_max_poll_interval_ms,
             'value_deserializer': lambda m: m.decode('utf-8') if m else None,
             'key_deserializer': lambda m: m.decode('utf-8') if m else None,
             'security_protocol': settings.kafka_security_protocol,
@@ -55,14 +230,40 @@ class MessageProcessor:
         }
         
         logger.info(f"Creating Kafka consumer with config: {consumer_config}")
-        consumer = KafkaConsumer(**consumer_config)
+        consumer = self.consumer_factory(**consumer_config)
         
         # Subscribe to topic
         logger.info(f"Subscribing to topic: {settings.monitored_topic}")
-        consumer.subscribe([settings.monitored_topic])
+        consumer.subscribe([settings.monitored_topic], listener=_RebalanceListener(self))
         
         return consumer
     
+    @staticmethod
+    def _to_kafka_message(record, polled_at: Optional[float] = None) -> KafkaMessage:
+        """Convert a Kafka consumer record to our internal format.
+        
+        Args:
+            record: The consumer record
+            polled_at: Wall clock time poll() returned the record, used to measure
+                how long it was in Kafka before the consumer received it
+        """
+        broker_dwell_ms = 0.0
+        # Records without a timestamp report -1
+        if polled_at is not None and record.timestamp is not None and record.timestamp >= 0:
+            # Clock skew with the producer can make a CreateTime timestamp lie in the future
+            broker_dwell_ms = round(max(0.0, 1000 * polled_at - record.timestamp), 1)
+        
+        return KafkaMessage(
+            topic=record.topic,
+            partition=record.partition,
+            offset=record.offset,
+            key=record.key,
+            value=record.value,
+            timestamp=record.timestamp,
+            headers=dict(record.headers) if record.headers else {},
+            broker_dwell_ms=broker_dwell_ms
+        )
+    
     def start_consuming(self) -> None:
         try:
             self.consumer = self.create_consumer()
@@ -70,29 +271,33 @@ class MessageProcessor:
             
             logger.info("Starting Kafka message consumption...")
             
-            for message in self.consumer:
-                if not self.running:
-                    break
+            # poll() returns at most poll_timeout_ms after being called, so
+            # the running flag is checked regularly even on an idle topic
+            while self.running:
+                self._apply_backpressure()
+                records = self.consumer.poll(
+                    timeout_ms=settings.kafka_poll_timeout_ms,
+                    max_records=settings.kafka_max_poll_records
+                )
+                polled_at = time.time()
+                self.commit_processed(sync=False)
+                if not records:
+                    continue
+                
+                batch = [
+                    self._to_kafka_message(record, polled_at)
+                    for partition_records in records.values()
+                    for record in partition_records
+                ]
+                
+                logger.info(f"Received batch of {len(batch)} message(s) from {len(records)} partition(s)")
                 
                 try:
-                    # Convert Kafka message to our internal format
-                    kafka_msg = KafkaMessage(
-                        topic=message.topic,
-                        partition=message.partition,
-                        offset=message.offset,
-                        key=message.key,
-                        value=message.value,
-                        timestamp=message.timestamp,
-                        headers=dict(message.headers) if message.headers else {}
-                    )
-                    
-                    logger.info(f"Received message from {message.topic}: {message.value}...")
-                    
-                    # Process the message
-                    self.message_handler(kafka_msg)
+                    # Process the batch
+                    self.batch_handler(batch)
                     
                 except Exception as e:
-                    logger.error(f"Error processing message: {e}", exc_info=True)
+                    logger.error(f"Error processing message batch: {e}", exc_info=True)
                     continue
                     
         except KafkaError as e:
@@ -102,16 +307,102 @@ class MessageProcessor:
             logger.error(f"Unexpected error in consumer: {e}")
             raise
         finally:
-            self.stop_consuming()
+            self._shutdown()
+    
+    def _apply_backpressure(self) -> None:
+        """Pause or resume fetching while still polling.
+        
+        poll() keeps being called while paused, so the consumer stays within
+        max_poll_interval_ms and keeps its partitions however long the backlog
+        takes to analyze.
+        """
+        if not self.backpressure_handler:
+            return
+        
+        should_pause = self.backpressure_handler(self.paused)
+        if should_pause:
+            # Re-pausing every iteration also covers partitions assigned since
+            assignment = self.consumer.assignment()
+            if assignment:
+                self.consumer.pause(*assignment)
+            if not self.paused:
+                logger.info("Scheduler is full, pausing fetching")
+        elif self.paused:
+            paused = self.consumer.paused()
+            if paused:
+                self.consumer.resume(*paused)
+            logger.info("Scheduler has drained, resuming fetching")
+        self.paused = should_pause
+    
+    def commit_processed(self, partitions: Optional[List[PartitionKey]] = None, sync: bool = True) -> None:
+        """Commit the offsets of fully processed messages.
+        
+        Asynchronous commits only send offsets that changed since the last
+        acknowledged commit, and are recorded once the broker acknowledges
+        them. Synchronous commits (shutdown and revocation) always send the
+        current offsets, so a failed asynchronous commit is never skipped.
+        
+        Must be called from the thread that polls the consumer.
+        """
+        offsets = self.offset_tracker.committable(partitions, include_unchanged=sync)
+        if not offsets or not self.consumer:
+            return
+        
+        commit_offsets = {
+            TopicPartition(topic, partition): _offset_and_metadata(offset)
+            for (topic, partition), offset in offsets.items()
+        }
+        
+        def on_commit(_offsets, response) -> None:
+            if isinstance(response, Exception):
+                logger.warning(f"Asynchronous commit of {offsets} failed, it will be retried: {response}")
+                return
+            self.offset_tracker.mark_committed(offsets)
+            logger.debug(f"Committed offsets: {offsets}")
+        
+        try:
+            if sync:
+                self.consumer.commit(commit_offsets)
+                self.offset_tracker.mark_committed(offsets)
+                logger.debug(f"Committed offsets: {offsets}")
+            else:
+                self.consumer.commit_async(commit_offsets, callback=on_commit)
+        except Exception as e:
+            logger.error(f"Error committing offsets {offsets}: {e}")
+    
+    def handle_revoked_partitions(self, partitions: List[PartitionKey]) -> None:
+        """Finish in-flight work and checkpoint partitions before they are reassigned."""
+        logger.info(f"Partitions revoked: {partitions}")
+        
+        if self.drain_handler:
+            self.drain_handler(partitions)
+        
+        self.commit_processed(partitions)
+        self.offset_tracker.forget(partitions)
     
     def stop_consuming(self) -> None:
-        """Stop consuming messages and close the consumer."""
+        """Ask the consume loop to stop fetching.
+        
+        This only sets a flag, so it is safe to call from a signal handler. The
+        consume loop then drains in-flight work, commits and closes the consumer.
+        """
         logger.info("Stopping Kafka consumer...")
         self.running = False
+    
+    def _shutdown(self) -> None:
+        """Drain in-flight work, commit processed offsets and close the consumer."""
+        self.running = False
         
         if self.consumer:
             try:
-                self.consumer.close()
+                if self.drain_handler:
+                    self.drain_handler(None)
+                self.commit_processed()
+            except Exception as e:
+                logger.error(f"Error draining Kafka consumer: {e}")
+            
+            try:
+                self.consumer.close(autocommit=False)
             except Exception as e:
                 logger.error(f"Error closing Kafka consumer: {e}")
             finally:
@@ -119,41 +410,175 @@ class MessageProcessor:
 
 
 class UnknownTopicMonitor:
-    """Specialized monitor for the configured monitored topic."""
+    """Specialized monitor for the configured monitored topic.
     
-    def __init__(self, ai_agent_callback: Callable[[str, Dict[str, Any]], None]):
+    Messages from the topic are queued in a PriorityScheduler and analyzed by
+    worker threads, so higher priority failures are handled first.
+    """
+    
+    def __init__(
+        self,
+        ai_agent_callback: Callable[[str, Dict[str, Any]], None],
+        consumer_factory: Optional[Callable[..., KafkaConsumer]] = None,
+        drain_callback: Optional[Callable[[], None]] = None
+    ):
         """Initialize the topic monitor.
         
         Args:
             ai_agent_callback: Function to call when a message is detected on the monitored topic
+            consumer_factory: Optional replacement for KafkaConsumer, see MessageProcessor
+            drain_callback: Function called once in-flight analyses have finished
+                on shutdown or revocation, before their offsets are committed
         """
         self.ai_agent_callback = ai_agent_callback
-        self.message_processor = MessageProcessor(self._handle_message)
+        self.drain_callback = drain_callback
+        self.scheduler: PriorityScheduler = create_priority_scheduler()
+        self.message_processor = MessageProcessor(
+            self._handle_batch, self._drain, consumer_factory, self._should_pause
+        )
+        self.offset_tracker = self.message_processor.offset_tracker
+        self.workers: Dict[int, threading.Thread] = {}
+        self.running = False
+        
+        register_settings_listener(self._apply_settings)
+    
+    def _handle_batch(self, batch: List[KafkaMessage]) -> None:
+        """Queue a batch of messages from the monitored topic for analysis."""
+        for message in batch:
+            if not self.running:
+                break
+            self._handle_message(message)
     
     def _handle_message(self, message: KafkaMessage) -> None:
-        """Handle messages from the monitored topic."""
+        """Queue a message from the monitored topic for analysis."""
         if message.topic == settings.monitored_topic:
-            logger.info(f"Message detected on monitored topic '{message.topic}': {message.value[:100]}...")
+            logger.info(f"Message detected on monitored topic '{message.topic}': {(message.value or '')[:100]}...")
             
-            # Extract metadata
-            metadata = {
-                "topic": message.topic,
-                "partition": message.partition,
-                "offset": message.offset,
-                "timestamp": message.timestamp,
-                "headers": message.headers,
-                "key": message.key
-            }
-            
-            # Call the AI agent to analyze the message
-            self.ai_agent_callback(message.value, metadata)
+            # Track before queueing so a worker can't complete it first
+            self.offset_tracker.track(message)
+            self.scheduler.put(message)
         else:
             logger.debug(f"Ignoring message from topic: {message.topic} (not monitoring this topic)")
     
+    def _should_pause(self, paused: bool) -> bool:
+        """Pause fetching once the scheduler is full, until it drains to half full."""
+        if paused:
+            return not self.scheduler.has_drained()
+        return self.scheduler.is_full()
+    
+    def _worker_loop(self, index: int) -> None:
+        """Analyze scheduled messages until the monitor is stopped or scaled down."""
+        while self.running and index < settings.scheduler_workers:
+            item = self.scheduler.get(timeout=1.0)
+            if item is None:
+                continue
+            
+            if not self.offset_tracker.started(item.message):
+                logger.info(f"Skipping message at offset {item.message.offset}, its partition was revoked")
+                continue
+            
+            try:
+                self._analyze(item)
+            except Exception as e:
+                logger.error(f"Error processing message: {e}", exc_info=True)
+            finally:
+                self.offset_tracker.completed(item.message)
+    
+    def _analyze(self, item: ScheduledMessage) -> None:
+        """Pass a scheduled message to the AI agent."""
+        message = item.message
+        
+        # Extract metadata
+        metadata = {
+            "topic": message.topic,
+            "partition": message.partition,
+            "offset": message.offset,
+            "timestamp": message.timestamp,
+            "headers": message.headers,
+            "key": message.key,
+            "priority_class": item.priority_class,
+            "queue_wait_ms": round(1000 * item.wait_seconds, 1),
+            "broker_dwell_ms": message.broker_dwell_ms
+        }
+        
+        # Call the AI agent to analyze the message
+        self.ai_agent_callback(message.value, metadata)
+    
     def start_monitoring(self) -> None:
         logger.info(f"Starting topic monitor for '{settings.monitored_topic}'...")
+        self.running = True
+        self._ensure_workers()
         self.message_processor.start_consuming()
     
+    def _ensure_workers(self) -> None:
+        """Start worker threads up to the configured count.
+        
+        Workers beyond the count exit on their own after their current message.
+        """
+        for index in range(settings.scheduler_workers):
+            worker = self.workers.get(index)
+            if worker is not None and worker.is_alive():
+                continue
+            
+            worker = threading.Thread(target=self._worker_loop, args=(index,), name=f"analysis-worker-{index}")
+            worker.daemon = True
+            worker.start()
+            self.workers[index] = worker
+    
+    def _apply_settings(self, updated: Settings) -> None:
+        """Apply runtime changes to scheduling and concurrency."""
+        self.scheduler.configure(
+            class_weights=updated.scheduler_class_weight_map,
+            max_wait_seconds=updated.scheduler_max_wait_seconds,
+            max_queue_size=updated.scheduler_max_queue_size
+        )
+        if self.running:
+            self._ensure_workers()
+    
     def stop_monitoring(self) -> None:
+        """Start draining: stop fetching and dispatching new messages.
+        
+        Returns immediately; the consume loop finishes the drain. Safe to call
+        from a signal handler.
+        """
         logger.info("Stopping topic monitor...")
-        self.message_processor.stop_consuming() 
\ No newline at end of file
+        self.running = False
+        self.message_processor.stop_consuming()
+    
+    def _drain(self, partitions: Optional[List[PartitionKey]]) -> None:
+        """Wait, up to the drain timeout, for in-flight analyses to finish.
+        
+        Queued messages that have not started are left uncommitted, so they
+        are redelivered without having cost any LLM calls.
+        
+        Args:
+            partitions: Partitions being given up, or None for all of them
+        """
+        deadline = time.monotonic() + settings.drain_timeout_seconds
+        
+        dropped = self.scheduler.remove(
+            lambda message: partitions is None or (message.topic, message.partition) in partitions
+        )
+        if dropped:
+            logger.info(f"Left {len(dropped)} queued message(s) uncommitted for redelivery")
+        
+        if self.offset_tracker.wait_until_idle(partitions, max(0.0, deadline - time.monotonic())):
+            logger.info("In-flight analyses finished, offsets are checkpointed")
+        else:
+            logger.warning(
+                f"In-flight analyses did not finish within {settings.drain_timeout_seconds}s; "
+                "their messages will be redelivered"
+            )
+        
+        if self.drain_callback:
+            try:
+                self.drain_callback()
+            except Exception as e:
+                logger.error(f"Error in drain callback: {e}", exc_info=True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler queue depth and wait times per priority class."""
+        stats = self.scheduler.get_stats()
+        stats["workers"] = sum(1 for worker in self.workers.values() if worker.is_alive())
+        stats["offsets"] = self.offset_tracker.get_stats()
+        return stats
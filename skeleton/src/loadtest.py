@@ -0,0 +1,388 @@
+"""Synthetic load generation against an in-process stand-in for Kafka.
+
+Drives UnknownTopicMonitor end to end (batching, scheduling, offset
+tracking and draining) without a broker or an inference server: messages
+come from FakeKafkaConsumer and analysis is simulated with a configurable
+delay.
+"""
+
+import json
+import logging
+import math
+import random
+import string
+import threading
+import time
+import tracemalloc
+import zlib
+from collections import namedtuple
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from kafka import TopicPartition
+
+from .config import settings
+from .kafka_consumer import UnknownTopicMonitor
+
+logger = logging.getLogger(__name__)
+
+# Mirrors the fields of kafka-python's ConsumerRecord that the consumer reads
+FakeRecord = namedtuple("FakeRecord", ["topic", "partition", "offset", "timestamp", "key", "value", "headers"])
+
+EVENT_TYPES = ["order.created", "order.cancelled", "payment.failed", "shipment.delayed", "customer.updated"]
+SOURCES = ["orders", "payments", "shipping", "crm", "loadtest"]
+SEVERITIES = ["critical", "error", "warning", "info"]
+
+# How long run() waits for start_monitoring to create and subscribe the consumer
+CONSUMER_START_TIMEOUT_SECONDS = 10.0
+
+
+@dataclass
+class LoadProfile:
+    """Shape of the generated messages."""
+
+    size_distribution: str = "lognormal"
+    mean_bytes: int = 512
+    max_bytes: int = 65536
+    duplicate_ratio: float = 0.1
+    malformed_ratio: float = 0.05
+    partitions: int = 3
+    processing_ms: float = 200.0
+    seed: Optional[int] = None
+
+
+class MessageFactory:
+    """Builds realistic unroutable messages following a LoadProfile."""
+
+    def __init__(self, profile: LoadProfile):
+        self.profile = profile
+        self.random = random.Random(profile.seed)
+        self._recent: List[Tuple[Optional[str], str, List[Tuple[str, bytes]]]] = []
+        self.generated = 0
+        self.duplicates = 0
+        self.malformed = 0
+
+    def _target_size(self) -> int:
+        profile = self.profile
+        if profile.size_distribution == "fixed":
+            size = profile.mean_bytes
+        elif profile.size_distribution == "uniform":
+            size = self.random.randint(1, 2 * profile.mean_bytes)
+        else:
+            # Log-normal with the requested mean: a long tail of large payloads
+            sigma = 1.0
+            size = int(self.random.lognormvariate(0, sigma) * profile.mean_bytes / math.exp(sigma ** 2 / 2))
+        return max(16, min(size, profile.max_bytes))
+
+    def _payload(self, size: int) -> str:
+        event = {
+            "type": self.random.choice(EVENT_TYPES + ["unknown.event", ""]),
+            "id": "".join(self.random.choices(string.hexdigits.lower(), k=16)),
+            "customer": f"cust-{self.random.randint(1, 100000)}",
+            "amount": round(self.random.uniform(1, 5000), 2),
+            "note": "",
+        }
+        padding = size - len(json.dumps(event))
+        if padding > 0:
+            event["note"] = " ".join(self.random.choices(["lorem", "ipsum", "dolor", "sit", "amet"], k=padding // 6 + 1))[:padding]
+        return json.dumps(event)
+
+    def _malformed(self, size: int) -> str:
+        kind = self.random.choice(["truncated", "text", "empty"])
+        if kind == "truncated":
+            return self._payload(size)[: max(1, size // 2)]
+        if kind == "text":
+            return "".join(self.random.choices(string.ascii_letters + " ", k=size))
+        return ""
+
+    def create(self) -> Tuple[Optional[str], str, List[Tuple[str, bytes]]]:
+        """Return a (key, value, headers) tuple for the next message."""
+        self.generated += 1
+
+        if self._recent and self.random.random() < self.profile.duplicate_ratio:
+            self.duplicates += 1
+            return self.random.choice(self._recent)
+
+        source = self.random.choice(SOURCES)
+        key = f"{'test' if source == 'loadtest' else 'prod'}-{source}-{self.random.randint(1, 50)}"
+        headers = [
+            ("severity", self.random.choice(SEVERITIES).encode()),
+            ("source", source.encode()),
+        ]
+
+        size = self._target_size()
+        if self.random.random() < self.profile.malformed_ratio:
+            self.malformed += 1
+            value = self._malformed(size)
+        else:
+            value = self._payload(size)
+
+        message = (key, value, headers)
+        self._recent.append(message)
+        if len(self._recent) > 100:
+            self._recent.pop(0)
+        return message
+
+
+class FakeKafkaConsumer:
+    """In-process stand-in for KafkaConsumer, as used by MessageProcessor.
+
+    Implements subscribe, poll, pause, resume, commit, commit_async and close
+    over in-memory partitions that a load generator appends to with ``produce``.
+    """
+
+    def __init__(self, partitions: int = 3, **config: Any):
+        self.config = config
+        self.topic: Optional[str] = None
+        self.listener = None
+        self._partitions = partitions
+        self._logs: Dict[int, List[FakeRecord]] = {p: [] for p in range(partitions)}
+        self._positions: Dict[int, int] = {p: 0 for p in range(partitions)}
+        self._committed: Dict[int, int] = {p: 0 for p in range(partitions)}
+        self._assigned = False
+        self._paused: Set[int] = set()
+        self._next_partition = 0
+        self._condition = threading.Condition()
+        self.closed = False
+
+    def subscribe(self, topics: List[str], listener=None) -> None:
+        self.topic = topics[0]
+        self.listener = listener
+
+    def produce(self, key: Optional[str], value: str, headers: List[Tuple[str, bytes]]) -> None:
+        """Append a message to a partition chosen by key, like the default partitioner."""
+        partition = zlib.crc32(key.encode()) % self._partitions if key else random.randrange(self._partitions)
+        with self._condition:
+            log = self._logs[partition]
+            log.append(FakeRecord(self.topic, partition, len(log), int(time.time() * 1000), key, value, headers))
+            self._condition.notify_all()
+
+    def _available(self) -> int:
+        return sum(len(self._logs[p]) - self._positions[p] for p in self._logs if p not in self._paused)
+
+    def assignment(self) -> Set[TopicPartition]:
+        return {TopicPartition(self.topic, p) for p in self._logs} if self._assigned else set()
+
+    def paused(self) -> Set[TopicPartition]:
+        with self._condition:
+            return {TopicPartition(self.topic, p) for p in self._paused}
+
+    def pause(self, *partitions: TopicPartition) -> None:
+        with self._condition:
+            self._paused.update(tp.partition for tp in partitions)
+
+    def resume(self, *partitions: TopicPartition) -> None:
+        with self._condition:
+            self._paused.difference_update(tp.partition for tp in partitions)
+
+    def poll(self, timeout_ms: int = 0, max_records: Optional[int] = None) -> Dict[TopicPartition, List[FakeRecord]]:
+        if not self._assigned:
+            self._assigned = True
+            if self.listener:
+                self.listener.on_partitions_assigned([TopicPartition(self.topic, p) for p in self._logs])
+
+        max_records = max_records or self.config.get("max_poll_records", 500)
+        with self._condition:
+            self._condition.wait_for(lambda: self._available() > 0, timeout_ms / 1000)
+
+            # Take records round-robin across partitions, like the real fetcher
+            records: Dict[TopicPartition, List[FakeRecord]] = {}
+            taken = 0
+            for _ in range(self._partitions):
+                partition = self._next_partition
+                self._next_partition = (self._next_partition + 1) % self._partitions
+                if partition in self._paused:
+                    continue
+                log, position = self._logs[partition], self._positions[partition]
+                batch = log[position:position + max_records - taken]
+                if batch:
+                    records[TopicPartition(self.topic, partition)] = batch
+                    self._positions[partition] += len(batch)
+                    taken += len(batch)
+                if taken >= max_records:
+                    break
+            return records
+
+    def commit(self, offsets: Dict[TopicPartition, Any]) -> None:
+        with self._condition:
+            for tp, offset_and_metadata in offsets.items():
+                self._committed[tp.partition] = offset_and_metadata.offset
+
+    def commit_async(self, offsets: Dict[TopicPartition, Any], callback=None) -> None:
+        self.commit(offsets)
+        if callback:
+            callback(offsets, None)
+
+    def close(self, autocommit: bool = True) -> None:
+        self.closed = True
+
+    def get_counts(self) -> Dict[str, int]:
+        """Return produced, fetched and committed message counts and the lag."""
+        with self._condition:
+            produced = sum(len(log) for log in self._logs.values())
+            fetched = sum(self._positions.values())
+            committed = sum(self._committed.values())
+        return {"produced": produced, "fetched": fetched, "committed": committed, "lag": produced - committed}
+
+
+@dataclass
+class Scenario:
+    """Produce rate over time: a base rate with optional periodic bursts."""
+
+    name: str
+    duration_seconds: float
+    rate_per_second: float
+    burst_rate_per_second: float = 0.0
+    burst_seconds: float = 0.0
+    burst_every_seconds: float = 0.0
+
+    def rate_at(self, elapsed: float) -> float:
+        if self.burst_every_seconds and elapsed % self.burst_every_seconds < self.burst_seconds:
+            return self.burst_rate_per_second
+        return self.rate_per_second
+
+
+def sustained(duration_seconds: float, rate_per_second: float) -> Scenario:
+    """A constant produce rate."""
+    return Scenario("sustained", duration_seconds, rate_per_second)
+
+
+def burst(duration_seconds: float, rate_per_second: float, burst_rate_per_second: float,
+          burst_seconds: float = 5.0, burst_every_seconds: float = 30.0) -> Scenario:
+    """A base produce rate with periodic bursts."""
+    return Scenario("burst", duration_seconds, rate_per_second,
+                    burst_rate_per_second, burst_seconds, burst_every_seconds)
+
+
+@dataclass
+class LoadTestReport:
+    """Samples taken during a run and a summary of them."""
+
+    scenario: str
+    samples: List[Dict[str, Any]] = field(default_factory=list)
+    summary: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"scenario": self.scenario, "summary": self.summary, "samples": self.samples}
+
+
+def _slope(points: List[Tuple[float, float]]) -> float:
+    """Least-squares slope of (x, y) points."""
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    if not denominator:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator
+
+
+class LoadTestRunner:
+    """Runs a scenario through UnknownTopicMonitor and samples its progress."""
+
+    def __init__(self, profile: LoadProfile, sample_interval: float = 1.0):
+        self.profile = profile
+        self.sample_interval = sample_interval
+        self.factory = MessageFactory(profile)
+        self.consumer: Optional[FakeKafkaConsumer] = None
+        self.processed = 0
+        self._random = random.Random(profile.seed)
+        self._lock = threading.Lock()
+
+    def _create_consumer(self, **config: Any) -> FakeKafkaConsumer:
+        self.consumer = FakeKafkaConsumer(partitions=self.profile.partitions, **config)
+        return self.consumer
+
+    def _simulate_analysis(self, message_content: str, metadata: Dict[str, Any]) -> None:
+        """Stand in for the AI agent with an exponentially distributed delay."""
+        if self.profile.processing_ms > 0:
+            with self._lock:
+                delay = self._random.expovariate(1000.0 / self.profile.processing_ms)
+            time.sleep(delay)
+        with self._lock:
+            self.processed += 1
+
+    def _produce(self, scenario: Scenario, stop: threading.Event) -> None:
+        started = time.monotonic()
+        due = 0.0
+        while not stop.is_set():
+            elapsed = time.monotonic() - started
+            if elapsed >= scenario.duration_seconds:
+                break
+
+            due += scenario.rate_at(elapsed) * 0.01
+            while due >= 1:
+                self.consumer.produce(*self.factory.create())
+                due -= 1
+            time.sleep(0.01)
+
+    def run(self, scenario: Scenario) -> LoadTestReport:
+        """Run a scenario to completion and return the sampled report."""
+        report = LoadTestReport(scenario=scenario.name)
+        monitor = UnknownTopicMonitor(self._simulate_analysis, consumer_factory=self._create_consumer)
+
+        tracemalloc.start()
+        consume_thread = threading.Thread(target=monitor.start_monitoring, name="loadtest-consumer", daemon=True)
+        consume_thread.start()
+
+        # start_monitoring can fail before it creates or subscribes the consumer
+        deadline = time.monotonic() + CONSUMER_START_TIMEOUT_SECONDS
+        while self.consumer is None or self.consumer.topic is None:
+            if not consume_thread.is_alive() or time.monotonic() >= deadline:
+                monitor.stop_monitoring()
+                tracemalloc.stop()
+                raise RuntimeError("The consumer did not start, see the log for the error")
+            time.sleep(0.01)
+
+        stop = threading.Event()
+        produce_thread = threading.Thread(target=self._produce, args=(scenario, stop), name="loadtest-producer", daemon=True)
+        produce_thread.start()
+
+        started = time.monotonic()
+        previous_processed = 0
+        try:
+            while produce_thread.is_alive():
+                time.sleep(self.sample_interval)
+                counts = self.consumer.get_counts()
+                current_memory, _ = tracemalloc.get_traced_memory()
+                elapsed = round(time.monotonic() - started, 2)
+
+                processed = self.processed
+
+                # Lag is measured from committed offsets, like a broker would
+                # report it; throughput from analyses completed, since priority
+                # scheduling can hold the commit position back
+                report.samples.append({
+                    "elapsed_seconds": elapsed,
+                    "produce_rate_per_second": scenario.rate_at(elapsed),
+                    **counts,
+                    "processed": processed,
+                    "queued": monitor.scheduler.qsize(),
+                    "throughput_per_second": round((processed - previous_processed) / self.sample_interval, 1),
+                    "memory_mb": round(current_memory / 1e6, 2),
+                })
+                previous_processed = processed
+        finally:
+            stop.set()
+            monitor.stop_monitoring()
+            consume_thread.join(timeout=settings.drain_timeout_seconds + 5)
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        report.summary = self._summarize(report.samples, peak_memory)
+        return report
+
+    def _summarize(self, samples: List[Dict[str, Any]], peak_memory: int) -> Dict[str, Any]:
+        throughputs = [sample["throughput_per_second"] for sample in samples]
+        return {
+            "messages_generated": self.factory.generated,
+            "duplicates": self.factory.duplicates,
+            "malformed": self.factory.malformed,
+            "max_throughput_per_second": max(throughputs, default=0.0),
+            "avg_throughput_per_second": round(sum(throughputs) / len(throughputs), 1) if throughputs else 0.0,
+            "lag_growth_per_second": round(_slope([(s["elapsed_seconds"], s["lag"]) for s in samples]), 2),
+            "final_lag": samples[-1]["lag"] if samples else 0,
+            "peak_memory_mb": round(peak_memory / 1e6, 2),
+            "memory_growth_mb_per_second": round(_slope([(s["elapsed_seconds"], s["memory_mb"]) for s in samples]), 4),
+        }
@@ -0,0 +1,160 @@
+"""Speculative prefetching of tool results during agent runs."""
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .config import Settings, register_settings_listener, settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Prefetch:
+    """A speculative call that is running or finished."""
+
+    future: Future
+    started_at: float
+    finished_at: Optional[float] = None
+
+
+class SpeculativePrefetcher:
+    """Starts likely tool calls in the background so the agent finds them ready.
+
+    Prefetches only live for the duration of a ``scope()``, normally one agent
+    run. Anything not taken by the end of the scope is discarded.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._scope: contextvars.ContextVar[Optional[Dict[str, _Prefetch]]] = contextvars.ContextVar(
+            "prefetch_scope", default=None
+        )
+        self._lock = threading.Lock()
+        self._started = 0
+        self._hits = 0
+        self._misses = 0
+        self._cache_hits = 0
+        self._discarded = 0
+        self._saved_seconds = 0.0
+
+    @contextmanager
+    def scope(self) -> Iterator[None]:
+        """Collect prefetches for one agent run and discard the unused ones."""
+        prefetches: Dict[str, _Prefetch] = {}
+        token = self._scope.set(prefetches)
+        try:
+            yield
+        finally:
+            self._scope.reset(token)
+            for key, prefetch in prefetches.items():
+                # Not started yet costs nothing; otherwise the result is dropped
+                prefetch.future.cancel()
+                logger.debug(f"Discarded unused prefetch '{key}'")
+            with self._lock:
+                self._discarded += len(prefetches)
+
+    def start(self, key: str, fn: Callable[[], Any]) -> None:
+        """Start ``fn`` in the background; a no-op outside of a scope."""
+        prefetches = self._scope.get()
+        if prefetches is None or key in prefetches:
+            return
+
+        prefetch = _Prefetch(future=None, started_at=time.monotonic())
+
+        def run() -> Any:
+            try:
+                return fn()
+            finally:
+                prefetch.finished_at = time.monotonic()
+
+        with self._lock:
+            # Run in a copy of the caller's context so tracing spans nest correctly
+            prefetch.future = self._executor.submit(contextvars.copy_context().run, run)
+            self._started += 1
+        prefetches[key] = prefetch
+
+    def take(self, key: str, cached: bool = False) -> Optional[Future]:
+        """Claim a prefetch started in the current scope.
+
+        Args:
+            key: The key the prefetch was started with
+            cached: Whether the caller can serve the call from a fresh cache,
+                in which case a missing prefetch costs no latency and is
+                counted as a cache hit rather than a miss
+
+        Returns:
+            The prefetch's future, or None if nothing was prefetched for the key
+        """
+        prefetches = self._scope.get()
+        prefetch = prefetches.pop(key, None) if prefetches is not None else None
+        if prefetch is None:
+            with self._lock:
+                if cached:
+                    self._cache_hits += 1
+                else:
+                    self._misses += 1
+            return None
+
+        # Time saved is how much of the call overlapped with other work
+        now = time.monotonic()
+        overlap_end = prefetch.finished_at if prefetch.finished_at is not None else now
+        with self._lock:
+            self._hits += 1
+            self._saved_seconds += max(0.0, overlap_end - prefetch.started_at)
+        return prefetch.future
+
+    def resize(self, max_workers: int) -> None:
+        """Replace the worker pool with one of the given size.
+
+        Prefetches already submitted finish on the old pool.
+        """
+        with self._lock:
+            if max_workers == self.max_workers:
+                return
+            old_executor = self._executor
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+            self.max_workers = max_workers
+        old_executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return prefetch hit rate and latency saved.
+
+        Calls served from a fresh cache without a prefetch are reported as
+        cache hits and left out of the hit rate.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "workers": self.max_workers,
+                "started": self._started,
+                "hits": self._hits,
+                "misses": self._misses,
+                "cache_hits": self._cache_hits,
+                "discarded": self._discarded,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "latency_saved_ms": round(1000 * self._saved_seconds, 1),
+                "avg_latency_saved_ms": round(1000 * self._saved_seconds / self._hits, 1) if self._hits else 0.0,
+            }
+
+
+def _worker_count(scheduler_workers: int) -> int:
+    """One prefetch worker per analysis worker, and at least two."""
+    return max(2, scheduler_workers)
+
+
+# Global prefetcher instance
+prefetcher = SpeculativePrefetcher(max_workers=_worker_count(settings.scheduler_workers))
+
+
+def _apply_settings(updated: Settings) -> None:
+    prefetcher.resize(_worker_count(updated.scheduler_workers))
+
+
+register_settings_listener(_apply_settings)
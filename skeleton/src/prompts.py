@@ -0,0 +1,141 @@
+"""Agent prompt layout that keeps a byte-identical prefix for inference server caching.
+
+The inference server reuses its KV cache for the longest prompt prefix it has
+seen before, so everything that is the same for every message (system message,
+tool descriptions, format instructions, catalog groups and task instructions)
+comes first, and the per-message input and ReAct scratchpad come last.
+"""
+
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+from .usage import CHARS_PER_TOKEN
+
+# Every analysis is sent here, in addition to the team the agent picks
+DEFAULT_RECIPIENT = "group:default/rhdh"
+
+# Shared by the agent's system message and the fast tier's instructions
+FAILURE_CAUSES = """- Ambiguous intent - message could fit multiple categories
+- Missing context - insufficient information to classify
+- Data format issues - malformed or unexpected structure
+- New content type - content not covered by existing rules
+- Schema validation failures - data doesn't match expected format"""
+
+SYSTEM_MESSAGE = f"""You are an expert system analyst specializing in message routing failure analysis.
+
+Your role is to:
+1. Analyze messages that failed to be routed properly
+2. Identify the likely cause of routing failures
+3. Provide specific recommendations for resolution
+4. Send notifications to relevant teams with your findings
+
+When analyzing messages, consider these common failure causes:
+{FAILURE_CAUSES}
+
+Always use the available tools to complete your analysis and send notifications."""
+
+# Goes before the tool descriptions rendered by the ReAct agent
+AGENT_PREFIX = SYSTEM_MESSAGE + "\n\nYou have access to the following tools:"
+
+TASK_INSTRUCTIONS = f"""Each question is a message that failed to be routed properly. Analyze it and generate a one sentence summary of the likely cause of the routing failure.
+
+Always send a notification containing your analysis summary to the {DEFAULT_RECIPIENT} entity, as well as the other entity you deem relevant."""
+
+# Per-message content only; the scratchpad grows by appending, so earlier
+# iterations of the same run are cache hits too
+QUESTION_TEMPLATE = """Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+
+def _escape(text: str) -> str:
+    """Escape braces so static text survives prompt template formatting."""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def select_catalog_groups(groups: List[Dict[str, str]], max_groups: int) -> List[Dict[str, str]]:
+    """Return up to ``max_groups`` groups in a stable order, for static prompts."""
+    return sorted(groups, key=lambda group: group["entity_ref"])[:max_groups]
+
+
+def format_group_lines(groups: List[Dict[str, str]]) -> List[str]:
+    """Render groups as list items naming the display name and entity reference."""
+    return [f"- {group['display_name']} ({group['entity_ref']})" for group in groups]
+
+
+def format_catalog_groups(groups: Optional[List[Dict[str, str]]], max_groups: int) -> str:
+    """Render the catalog groups in a stable order for the static prompt."""
+    if not groups:
+        return "Use the catalog tool to find the Backstage groups that can be notified."
+
+    shown = select_catalog_groups(groups, max_groups)
+    lines = ["Backstage groups that can be notified:"]
+    lines.extend(format_group_lines(shown))
+    if len(shown) < len(groups):
+        lines.append(
+            f"({len(groups) - len(shown)} more group(s) are in the catalog; "
+            "use the catalog tool to search them if none of these fit.)"
+        )
+    return "\n".join(lines)
+
+
+def build_agent_suffix(groups: Optional[List[Dict[str, str]]], max_groups: int) -> str:
+    """Build the agent prompt suffix: static groups and instructions, then the question."""
+    static = format_catalog_groups(groups, max_groups) + "\n\n" + TASK_INSTRUCTIONS
+    return _escape(static) + "\n\n" + QUESTION_TEMPLATE
+
+
+def hash_prefix(prefix: str) -> str:
+    """Return the SHA-256 hex digest identifying a prompt prefix."""
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+
+class PrefixTracker:
+    """Measures how often agent runs reuse the same static prompt prefix."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prefix = ""
+        self.prefix_hash = hash_prefix("")
+        self._changes = 0
+        self._runs = 0
+        self._reused = 0
+        self._uses_since_change = 0
+        self._last_used_hash: Optional[str] = None
+
+    def update(self, prefix: str) -> bool:
+        """Set the current prefix, returning True if it differs from the previous one."""
+        prefix_hash = hash_prefix(prefix)
+        with self._lock:
+            if prefix_hash == self.prefix_hash:
+                return False
+            self.prefix = prefix
+            self.prefix_hash = prefix_hash
+            self._changes += 1
+            self._uses_since_change = 0
+            return True
+
+    def record_use(self) -> str:
+        """Record an agent run with the current prefix and return its hash."""
+        with self._lock:
+            self._runs += 1
+            self._uses_since_change += 1
+            if self.prefix_hash == self._last_used_hash:
+                self._reused += 1
+            self._last_used_hash = self.prefix_hash
+            return self.prefix_hash
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the current prefix's hash and length, and how often it was reused."""
+        with self._lock:
+            return {
+                "sha256": self.prefix_hash,
+                "chars": len(self.prefix),
+                "estimated_tokens": len(self.prefix) // CHARS_PER_TOKEN,
+                "changes": self._changes,
+                "runs": self._runs,
+                "uses_since_change": self._uses_since_change,
+                "reuse_rate": round(self._reused / self._runs, 3) if self._runs else 0.0,
+            }
@@ -0,0 +1,329 @@
+"""Priority scheduling of unroutable messages ahead of AI analysis."""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Optional, Any
+
+from .config import settings
+
+if TYPE_CHECKING:
+    from .kafka_consumer import KafkaMessage
+
+logger = logging.getLogger(__name__)
+
+# A priority function maps a message to a priority class name, or None when
+# it has no opinion. Functions are evaluated in order and the first class
+# returned wins.
+PriorityFunction = Callable[["KafkaMessage"], Optional[str]]
+
+DEFAULT_PRIORITY_CLASS = "normal"
+
+# Common severity spellings mapped onto the default priority classes
+SEVERITY_ALIASES = {
+    "fatal": "critical",
+    "emergency": "critical",
+    "error": "high",
+    "err": "high",
+    "warning": "normal",
+    "warn": "normal",
+    "info": "low",
+    "debug": "low",
+    "trace": "low",
+}
+
+
+def _header_value(message: "KafkaMessage", header_name: str) -> Optional[str]:
+    """Return a header value as a lowercase string, decoding bytes if needed."""
+    for name, value in message.headers.items():
+        if name.lower() != header_name.lower() or value is None:
+            continue
+        if isinstance(value, bytes):
+            value = value.decode("utf-8", errors="replace")
+        return str(value).strip().lower()
+    return None
+
+
+def header_severity(header_name: str) -> PriorityFunction:
+    """Classify messages by a severity header such as ``severity: critical``."""
+    def classify(message: "KafkaMessage") -> Optional[str]:
+        value = _header_value(message, header_name)
+        if not value:
+            return None
+        return SEVERITY_ALIASES.get(value, value)
+    return classify
+
+
+def source_service(header_name: str, service_classes: Dict[str, str]) -> PriorityFunction:
+    """Classify messages by the service named in a source header."""
+    def classify(message: "KafkaMessage") -> Optional[str]:
+        value = _header_value(message, header_name)
+        if not value:
+            return None
+        return service_classes.get(value)
+    return classify
+
+
+def key_prefix(prefix_classes: Dict[str, str]) -> PriorityFunction:
+    """Classify messages by the prefix of their Kafka key (longest prefix wins)."""
+    prefixes = sorted(prefix_classes.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def classify(message: "KafkaMessage") -> Optional[str]:
+        if not message.key:
+            return None
+        for prefix, priority_class in prefixes:
+            if message.key.startswith(prefix):
+                return priority_class
+        return None
+    return classify
+
+
+def message_age(stale_after_seconds: float, stale_class: str = "low") -> PriorityFunction:
+    """Demote messages whose Kafka timestamp is older than the given age."""
+    def classify(message: "KafkaMessage") -> Optional[str]:
+        if stale_after_seconds <= 0 or not message.timestamp:
+            return None
+        age_seconds = time.time() - (message.timestamp / 1000.0)
+        return stale_class if age_seconds > stale_after_seconds else None
+    return classify
+
+
+@dataclass
+class ScheduledMessage:
+    """A message waiting in, or handed out by, the scheduler."""
+
+    message: "KafkaMessage"
+    priority_class: str
+    enqueued_at: float
+
+    @property
+    def wait_seconds(self) -> float:
+        return time.monotonic() - self.enqueued_at
+
+
+@dataclass
+class _ClassQueue:
+    """Queue and counters for a single priority class."""
+
+    name: str
+    weight: int
+    items: Deque[ScheduledMessage] = field(default_factory=deque)
+    current_weight: int = 0
+    enqueued: int = 0
+    dequeued: int = 0
+    promoted: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+class PriorityScheduler:
+    """Weighted fair queue of messages across priority classes.
+
+    Classes are served by smooth weighted round-robin, so a class with weight
+    8 gets eight turns for every turn of a class with weight 1 while both have
+    work queued. Any message that has waited longer than ``max_wait_seconds``
+    is served ahead of the rotation so low classes are never starved.
+    """
+
+    def __init__(
+        self,
+        class_weights: Dict[str, int],
+        priority_functions: List[PriorityFunction],
+        max_wait_seconds: float = 300.0,
+        max_queue_size: int = 1000,
+        default_class: str = DEFAULT_PRIORITY_CLASS,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            class_weights: Priority class names mapped to their relative weights
+            priority_functions: Functions used to classify incoming messages
+            max_wait_seconds: Wait time after which a message jumps the rotation
+            max_queue_size: Total number of queued messages at which ``is_full``
+                reports that consumption should pause
+            default_class: Class used when no priority function matches
+        """
+        if default_class not in class_weights:
+            class_weights = dict(class_weights, **{default_class: 1})
+
+        self.priority_functions = priority_functions
+        self.max_wait_seconds = max_wait_seconds
+        self.max_queue_size = max_queue_size
+        self.default_class = default_class
+        self._classes: Dict[str, _ClassQueue] = {
+            name: _ClassQueue(name=name, weight=max(1, weight))
+            for name, weight in sorted(class_weights.items(), key=lambda item: -item[1])
+        }
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def classify(self, message: "KafkaMessage") -> str:
+        """Return the priority class for a message."""
+        for priority_function in self.priority_functions:
+            try:
+                priority_class = priority_function(message)
+            except Exception as e:
+                logger.warning(f"Priority function failed, skipping it: {e}")
+                continue
+            if priority_class in self._classes:
+                return priority_class
+        return self.default_class
+
+    def put(self, message: "KafkaMessage") -> None:
+        """Queue a message.
+
+        Never blocks, so the polling thread can always hand over a whole
+        batch; it pauses consumption while ``is_full`` instead.
+        """
+        priority_class = self.classify(message)
+
+        with self._condition:
+            queue = self._classes[priority_class]
+            queue.items.append(ScheduledMessage(message, priority_class, time.monotonic()))
+            queue.enqueued += 1
+            self._size += 1
+            self._condition.notify_all()
+
+        logger.debug(f"Scheduled message at offset {message.offset} as '{priority_class}'")
+
+    def get(self, timeout: Optional[float] = None) -> Optional[ScheduledMessage]:
+        """Return the next message to analyze, or None if the timeout expired."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._size > 0, timeout):
+                return None
+
+            queue = self._select_class()
+            item = queue.items.popleft()
+            wait = item.wait_seconds
+
+            queue.dequeued += 1
+            queue.total_wait += wait
+            queue.max_wait = max(queue.max_wait, wait)
+            self._size -= 1
+            self._condition.notify_all()
+
+        return item
+
+    def _select_class(self) -> _ClassQueue:
+        """Pick the class to serve next. Must be called with the lock held."""
+        pending = [queue for queue in self._classes.values() if queue.items]
+
+        # Starvation protection: the longest waiting overdue message goes first
+        overdue = [
+            queue for queue in pending
+            if queue.items[0].wait_seconds >= self.max_wait_seconds
+        ]
+        if overdue:
+            queue = max(overdue, key=lambda q: q.items[0].wait_seconds)
+            queue.promoted += 1
+            return queue
+
+        # Smooth weighted round-robin across the classes that have work
+        total_weight = 0
+        selected = pending[0]
+        for queue in pending:
+            queue.current_weight += queue.weight
+            total_weight += queue.weight
+            if queue.current_weight > selected.current_weight:
+                selected = queue
+        selected.current_weight -= total_weight
+        return selected
+
+    def remove(self, predicate: Callable[["KafkaMessage"], bool]) -> List[ScheduledMessage]:
+        """Remove and return every queued message matching the predicate."""
+        removed = []
+        with self._condition:
+            for queue in self._classes.values():
+                kept = deque()
+                for item in queue.items:
+                    (removed if predicate(item.message) else kept).append(item)
+                queue.items = kept
+            self._size -= len(removed)
+            self._condition.notify_all()
+        return removed
+
+    def configure(self, class_weights: Dict[str, int], max_wait_seconds: float, max_queue_size: int) -> None:
+        """Update weights and limits in place, keeping queued messages.
+        
+        Classes missing from ``class_weights`` keep their current weight so
+        nothing already queued is stranded.
+        """
+        with self._condition:
+            for name, weight in class_weights.items():
+                if name in self._classes:
+                    self._classes[name].weight = max(1, weight)
+                else:
+                    self._classes[name] = _ClassQueue(name=name, weight=max(1, weight))
+            self.max_wait_seconds = max_wait_seconds
+            self.max_queue_size = max_queue_size
+            self._condition.notify_all()
+
+    def is_full(self) -> bool:
+        """Return True once the queue has reached ``max_queue_size``."""
+        with self._condition:
+            return self._size >= self.max_queue_size
+
+    def has_drained(self) -> bool:
+        """Return True once a full queue has drained to its low-water mark (half full)."""
+        with self._condition:
+            return self._size <= self.max_queue_size // 2
+
+    def qsize(self) -> int:
+        """Return the total number of queued messages."""
+        with self._condition:
+            return self._size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue depth and wait times per priority class."""
+        with self._condition:
+            classes = {}
+            for queue in self._classes.values():
+                classes[queue.name] = {
+                    "weight": queue.weight,
+                    "depth": len(queue.items),
+                    "enqueued": queue.enqueued,
+                    "dequeued": queue.dequeued,
+                    "promoted": queue.promoted,
+                    "avg_wait_ms": round(1000 * queue.total_wait / queue.dequeued, 1) if queue.dequeued else 0.0,
+                    "max_wait_ms": round(1000 * queue.max_wait, 1),
+                    "oldest_wait_ms": round(1000 * queue.items[0].wait_seconds, 1) if queue.items else 0.0,
+                }
+
+            return {
+                "queued": self._size,
+                "max_queue_size": self.max_queue_size,
+                "max_wait_seconds": self.max_wait_seconds,
+                "classes": classes,
+            }
+
+
+def create_priority_functions() -> List[PriorityFunction]:
+    """Build the priority functions named in settings, in order."""
+    factories: Dict[str, Callable[[], PriorityFunction]] = {
+        "header_severity": lambda: header_severity(settings.scheduler_severity_header),
+        "source_service": lambda: source_service(
+            settings.scheduler_source_header, settings.scheduler_source_class_map
+        ),
+        "key_prefix": lambda: key_prefix(settings.scheduler_key_prefix_class_map),
+        "message_age": lambda: message_age(settings.scheduler_stale_after_seconds),
+    }
+
+    priority_functions = []
+    for name in settings.scheduler_priority_function_list:
+        if name not in factories:
+            logger.warning(f"Unknown priority function '{name}', ignoring it")
+            continue
+        priority_functions.append(factories[name]())
+    return priority_functions
+
+
+def create_priority_scheduler() -> PriorityScheduler:
+    """Factory function to create the scheduler from settings."""
+    return PriorityScheduler(
+        class_weights=settings.scheduler_class_weight_map,
+        priority_functions=create_priority_functions(),
+        max_wait_seconds=settings.scheduler_max_wait_seconds,
+        max_queue_size=settings.scheduler_max_queue_size,
+    )
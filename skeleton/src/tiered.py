@@ -0,0 +1,186 @@
+"""Fast-tier analysis with a small model, escalating to the primary agent."""
+
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from langchain_openai import OpenAI
+
+from .config import settings
+from .prompts import FAILURE_CAUSES, format_group_lines, select_catalog_groups
+
+logger = logging.getLogger(__name__)
+
+FAST_TIER = "fast"
+PRIMARY_TIER = "primary"
+
+FAST_TIER_INSTRUCTIONS = f"""You are an expert system analyst specializing in message routing failure analysis.
+
+Decide the most likely cause of the routing failure of the message below. Common causes are:
+{FAILURE_CAUSES}
+
+Choose the team that should be told about it from this list of Backstage groups, or leave it empty if none fits:
+{{groups}}
+
+Reply with only a JSON object, with no other text:
+{{{{"summary": "<one sentence summary of the likely cause>", "recipient": "<entity reference of the group, e.g. group:default/name, or empty>", "confidence": <0.0 to 1.0, how sure you are of the cause>}}}}
+"""
+
+
+@dataclass
+class FastTierResult:
+    """A parsed, validated answer from the fast model."""
+
+    summary: str
+    recipient: Optional[str]
+    confidence: float
+
+
+def parse_fast_tier_response(text: str, known_groups: Set[str]) -> Optional[FastTierResult]:
+    """Parse the fast model's JSON answer, returning None if it is malformed.
+
+    The first JSON object in the text is used; anything before or after it
+    is ignored.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    try:
+        data, _ = json.JSONDecoder().raw_decode(text, start)
+        summary = str(data.get("summary", "")).strip()
+        confidence = float(data.get("confidence"))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+    if not summary or not 0.0 <= confidence <= 1.0:
+        return None
+
+    # The group list shows references in parentheses, which models sometimes copy
+    recipient = str(data.get("recipient") or "").strip().strip("()").strip() or None
+    # A recipient the catalog doesn't know is a hallucination, not a routing decision
+    if recipient is not None and recipient not in known_groups:
+        return None
+
+    return FastTierResult(summary=summary, recipient=recipient, confidence=confidence)
+
+
+class TierStats:
+    """Counts and latency per tier, and why messages escalated."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._messages = {FAST_TIER: 0, PRIMARY_TIER: 0}
+        self._latency = {FAST_TIER: 0.0, PRIMARY_TIER: 0.0}
+        self._resolved_by_fast = 0
+        self._escalations: Dict[str, int] = {}
+
+    def record(self, tier: str, duration_seconds: float) -> None:
+        with self._lock:
+            self._messages[tier] += 1
+            self._latency[tier] += duration_seconds
+
+    def record_resolved(self) -> None:
+        with self._lock:
+            self._resolved_by_fast += 1
+
+    def record_escalation(self, reason: str) -> None:
+        with self._lock:
+            self._escalations[reason] = self._escalations.get(reason, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tiers = {
+                tier: {
+                    "messages": count,
+                    "avg_latency_ms": round(1000 * self._latency[tier] / count, 1) if count else 0.0,
+                }
+                for tier, count in self._messages.items()
+            }
+            escalated = sum(self._escalations.values())
+            attempted = self._resolved_by_fast + escalated
+            return {
+                **tiers,
+                "resolved_by_fast": self._resolved_by_fast,
+                "escalations": dict(self._escalations),
+                "fast_share": round(self._resolved_by_fast / attempted, 3) if attempted else 0.0,
+            }
+
+
+def fast_tier_llm_params() -> Dict[str, Any]:
+    """Return the model parameters that differ between the fast model and the agent's."""
+    return {
+        "model_name": settings.ai_fast_model,
+        "temperature": 0.0,
+        "max_tokens": settings.ai_fast_max_tokens,
+        "openai_api_base": settings.ai_fast_inference_server_url or settings.inference_server_url
+    }
+
+
+class FastTierAnalyzer:
+    """Analyzes messages with a small model in a single call, without tools."""
+
+    def __init__(self, llm: OpenAI):
+        self.llm = llm
+
+    def build_instructions(self, groups: List[Dict[str, str]]) -> str:
+        """Build the static part of the prompt, which is the same for every message.
+
+        Lists the same capped, sorted groups as the agent prompt, so large
+        catalogs don't overflow the small model's context.
+        """
+        shown = select_catalog_groups(groups, settings.catalog_max_groups)
+        group_list = "\n".join(format_group_lines(shown)) or "- (no groups available)"
+        return FAST_TIER_INSTRUCTIONS.format(groups=group_list)
+
+    def build_prompt(self, message_content: str, metadata: Dict[str, Any], groups: List[Dict[str, str]]) -> str:
+        """Build the prompt with the static instructions first and the message last."""
+        return self.build_instructions(groups) + f"""
+Topic: {metadata.get('topic')}
+Message: {message_content}
+
+JSON:"""
+
+    def analyze(self, message_content: str, metadata: Dict[str, Any], groups: List[Dict[str, str]],
+                callbacks: List[Any]) -> Tuple[Optional[FastTierResult], str]:
+        """Analyze a message with the fast model.
+
+        The recipient is validated against every catalog group, not only
+        those listed in the prompt.
+
+        Returns:
+            The result if it is confident enough, else None; and the reason
+            for escalating (empty when the result is accepted)
+        """
+        try:
+            text = self.llm.invoke(
+                self.build_prompt(message_content, metadata, groups),
+                config={"callbacks": callbacks}
+            )
+        except Exception as e:
+            logger.warning(f"Fast tier model failed, escalating: {e}")
+            return None, "error"
+
+        result = parse_fast_tier_response(text, {group["entity_ref"] for group in groups})
+        if result is None:
+            logger.info(f"Fast tier response was malformed, escalating: {text[:200]}")
+            return None, "malformed"
+
+        if result.confidence < settings.ai_tier_confidence_threshold:
+            logger.info(f"Fast tier confidence {result.confidence} below threshold, escalating")
+            return None, "low_confidence"
+
+        return result, ""
+
+
+def create_fast_tier_analyzer(create_llm: Callable[..., OpenAI]) -> Optional[FastTierAnalyzer]:
+    """Create the fast tier if tiered mode is configured, otherwise None.
+
+    Args:
+        create_llm: Builds a model client from parameter overrides, so the
+            fast model shares the agent's HTTP connection pool
+    """
+    if not settings.ai_tiered_enabled or not settings.ai_fast_model:
+        return None
+    return FastTierAnalyzer(create_llm(**fast_tier_llm_params()))
@@ -1,11 +1,12 @@
 """Tools for the AI Agent."""
 
 from .backstage_notification_tool import BackstageNotificationTool, create_backstage_notification_tool
-from .backstage_catalog import BackstageCatalogTool, create_backstage_catalog_tool
+from .backstage_catalog import BackstageCatalogTool, CatalogError, create_backstage_catalog_tool
 
 __all__ = [
     "BackstageNotificationTool", 
     "create_backstage_notification_tool",
     "BackstageCatalogTool",
+    "CatalogError",
     "create_backstage_catalog_tool"
 ] 
\ No newline at end of file
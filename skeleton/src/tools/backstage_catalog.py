@@ -2,97 +2,291 @@
 
 import json
 import logging
-from typing import List, Dict, Any
+import re
+import threading
+import time
+from typing import List, Dict, Any, Iterator, Optional, Set
 from pydantic import BaseModel, Field
 import requests
 from langchain.tools import BaseTool
 
 from ..config import settings
+from ..prefetch import prefetcher
+from ..tracing import tracer
+from .backstage_http import get_backstage_session
 
 logger = logging.getLogger(__name__)
 
 
+class CatalogError(Exception):
+    """Raised when the Backstage Catalog API returns an error response."""
+
+
 class CatalogInput(BaseModel):
     """Input schema for the Backstage Catalog tool."""
     
     query: str = Field(
         default="",
-        description="Not used - just list all groups (leave empty)"
+        description="Optional keywords from the message (team, service or domain names) used to rank groups"
     )
 
 
+class _GroupCache:
+    """Time-limited cache of the catalog group list.
+    
+    Also remembers the last failed fetch for ``catalog_failure_backoff_seconds``
+    so an unavailable catalog is not queried again for every message.
+    """
+    
+    def __init__(self):
+        self._groups: Optional[List[Dict[str, str]]] = None
+        self._fetched_at = 0.0
+        self._failure: Optional[str] = None
+        self._failed_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        # Held while fetching, so concurrent callers share a single fetch
+        self.fetch_lock = threading.Lock()
+    
+    def get(self) -> Optional[List[Dict[str, str]]]:
+        """Return the groups if they are fresh, otherwise None."""
+        with self._lock:
+            if self._groups is None:
+                return None
+            if time.monotonic() - self._fetched_at >= settings.catalog_cache_ttl_seconds:
+                return None
+            return self._groups
+    
+    def get_stale(self) -> Optional[List[Dict[str, str]]]:
+        """Return the last successfully fetched groups, however old."""
+        with self._lock:
+            return self._groups
+    
+    def set(self, groups: List[Dict[str, str]]) -> None:
+        with self._lock:
+            self._groups = groups
+            self._fetched_at = time.monotonic()
+            self._failure = None
+    
+    def recent_failure(self) -> Optional[str]:
+        """Return the last fetch error if it is within the failure backoff."""
+        with self._lock:
+            if self._failure is None:
+                return None
+            if time.monotonic() - self._failed_at >= settings.catalog_failure_backoff_seconds:
+                return None
+            return self._failure
+    
+    def set_failure(self, error: str) -> None:
+        with self._lock:
+            self._failure = error
+            self._failed_at = time.monotonic()
+    
+    def begin_refresh(self) -> bool:
+        """Claim the background refresh; False if one is already running."""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            return True
+    
+    def end_refresh(self) -> None:
+        with self._lock:
+            self._refreshing = False
+
+
+_group_cache = _GroupCache()
+
+# Only the fields needed to build entity references and display names
+GROUP_FIELDS = "metadata.name,metadata.namespace,metadata.title"
+
+
+def _keywords(text: str) -> Set[str]:
+    """Split text into lowercase keywords for relevance matching."""
+    return {word for word in re.split(r"[^a-z0-9]+", text.lower()) if len(word) >= 3}
+
+
+def rank_groups(groups: List[Dict[str, str]], query: str) -> List[Dict[str, str]]:
+    """Order groups by how many query keywords their name or title contains."""
+    keywords = _keywords(query)
+    if not keywords:
+        return list(groups)
+    
+    def score(group: Dict[str, str]) -> int:
+        group_words = _keywords(f"{group['entity_ref']} {group['display_name']}")
+        return sum(1 for keyword in keywords if any(keyword in word or word in keyword for word in group_words))
+    
+    # sorted() is stable, so groups with equal scores keep catalog order
+    return sorted(groups, key=score, reverse=True)
+
+
 class BackstageCatalogTool(BaseTool):
     """Tool for querying the Backstage Catalog API to list Groups."""
     
     name: str = "backstage_catalog_groups"
     description: str = (
-        "Look up and list all Groups from the Backstage Catalog API. "
+        "Look up Groups from the Backstage Catalog API, most relevant first. "
         "This can help identify team structures and ownership for routing messages. "
-        "Input is not used - just leave empty to get all groups."
+        "Input is optional keywords from the message (team, service or domain names); leave empty to list groups."
     )
     args_schema: type[BaseModel] = CatalogInput
     
+    def iter_groups(self) -> Iterator[Dict[str, str]]:
+        """Yield Groups from the Backstage Catalog API one page at a time.
+        
+        Uses the cursor-paginated by-query endpoint with a field projection, so
+        only one small page of minimal entities is held in memory at once.
+        
+        Raises:
+            CatalogError: If the Catalog API returns an error status
+            requests.exceptions.RequestException: On network errors
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {settings.backstage_token}"
+        }
+        
+        # Backstage Catalog API endpoint for paginated entity queries
+        url = f"{settings.backstage_api_url}/catalog/entities/by-query"
+        
+        # Parameters for the first page; later pages only need the cursor
+        params: Dict[str, Any] = {
+            "filter": "kind=group",
+            "fields": GROUP_FIELDS,
+            "orderField": "metadata.name,asc",
+            "limit": settings.catalog_page_size
+        }
+        
+        logger.info("Querying Backstage Catalog for all Groups")
+        
+        page = 0
+        while True:
+            page += 1
+            with tracer.span("http.backstage_catalog", {"http.url": url, "catalog.page": page}) as span:
+                response = get_backstage_session().get(
+                    url,
+                    headers=headers,
+                    params=params,
+                    timeout=30
+                )
+                if span is not None:
+                    span.set_attribute("http.status_code", response.status_code)
+                    span.set_attribute("http.response_bytes", len(response.content))
+            
+            if response.status_code != 200:
+                raise CatalogError(f"Failed to query Backstage Catalog: {response.status_code} - {response.text}")
+            
+            body = response.json()
+            for entity in body.get("items", []):
+                metadata = entity.get("metadata", {})
+                name = metadata.get("name", "")
+                namespace = metadata.get("namespace", "default")
+                display_name = metadata.get("title", "") or name
+                
+                # Create entity reference in the format: group:namespace/name
+                yield {
+                    "entity_ref": f"group:{namespace}/{name}",
+                    "display_name": display_name
+                }
+            
+            next_cursor = body.get("pageInfo", {}).get("nextCursor")
+            if not next_cursor:
+                break
+            params = {"cursor": next_cursor, "fields": GROUP_FIELDS, "limit": settings.catalog_page_size}
+    
+    def fetch_groups(self) -> List[Dict[str, str]]:
+        """Return all catalog Groups, served from cache while it is fresh.
+        
+        Concurrent callers share one fetch. After a failed fetch, callers
+        fail fast with the same error until the failure backoff has passed.
+        
+        Raises:
+            CatalogError: If the Catalog API returns an error status, or failed recently
+            requests.exceptions.RequestException: On network errors
+        """
+        groups = _group_cache.get()
+        if groups is not None:
+            return groups
+        
+        with _group_cache.fetch_lock:
+            # Another caller may have fetched while we waited for the lock
+            groups = _group_cache.get()
+            if groups is not None:
+                return groups
+            
+            failure = _group_cache.recent_failure()
+            if failure is not None:
+                raise CatalogError(f"Backstage Catalog recently unavailable, not retrying yet: {failure}")
+            
+            try:
+                groups = list(self.iter_groups())
+            except Exception as e:
+                _group_cache.set_failure(str(e))
+                raise
+        
+        logger.info(f"Found {len(groups)} groups in Backstage Catalog")
+        _group_cache.set(groups)
+        return groups
+    
+    def cached_groups(self) -> Optional[List[Dict[str, str]]]:
+        """Return the last fetched groups without blocking, even if they are stale.
+        
+        Starts a background refresh when the cache has expired, so the
+        next caller sees the new list.
+        
+        Returns:
+            The groups, or None if they have never been fetched successfully
+        """
+        if _group_cache.get() is None:
+            self._refresh_in_background()
+        return _group_cache.get_stale()
+    
+    def _refresh_in_background(self) -> None:
+        """Refresh the group cache on a background thread, one refresh at a time."""
+        if _group_cache.recent_failure() is not None or not _group_cache.begin_refresh():
+            return
+        
+        def refresh() -> None:
+            try:
+                self.fetch_groups()
+            except Exception as e:
+                logger.warning(f"Background refresh of catalog groups failed: {e}")
+            finally:
+                _group_cache.end_refresh()
+        
+        threading.Thread(target=refresh, name="catalog-refresh", daemon=True).start()
+    
+    def prefetch(self) -> None:
+        """Speculatively start fetching groups for the current agent run."""
+        if _group_cache.get() is None:
+            prefetcher.start(self.name, self.fetch_groups)
+    
     def _run(self, query: str = "") -> str:
         """Query the Backstage Catalog API for Groups."""
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {settings.backstage_token}"
-            }
+            # Use the result of a speculative prefetch if one was started
+            prefetched = prefetcher.take(self.name, cached=_group_cache.get() is not None)
+            groups = prefetched.result() if prefetched is not None else self.fetch_groups()
             
-            # Backstage Catalog API endpoint for entities
-            url = f"{settings.backstage_api_url}/catalog/entities"
+            if not groups:
+                return "No groups found in the Backstage Catalog."
             
-            # Parameters for filtering Groups
-            params = {
-                "filter": "kind=group"
-            }
+            # Cap the observation so large catalogs don't flood the prompt
+            shown = rank_groups(groups, query)[:settings.catalog_max_groups]
             
-            logger.info("Querying Backstage Catalog for all Groups")
+            # Format the response for the agent
+            lines = [f"Found {len(groups)} group(s) in Backstage Catalog"]
+            if len(shown) < len(groups):
+                lines[0] += f", showing the {len(shown)} most relevant"
+            lines[0] += ":\n"
+            lines.extend(f"- **{group['display_name']}** ({group['entity_ref']})" for group in shown)
             
-            response = requests.get(
-                url,
-                headers=headers,
-                params=params,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                entities = response.json()
-                groups = []
-                
-                for entity in entities:
-                    if entity.get("kind") == "Group":
-                        name = entity.get("metadata", {}).get("name", "")
-                        namespace = entity.get("metadata", {}).get("namespace", "default")
-                        display_name = entity.get("metadata", {}).get("title", "") or name
-                        
-                        # Create entity reference in the format: group:namespace/name
-                        entity_ref = f"group:{namespace}/{name}"
-                        
-                        groups.append({
-                            "entity_ref": entity_ref,
-                            "display_name": display_name
-                        })
-                
-                logger.info(f"Found {len(groups)} groups in Backstage Catalog")
-                
-                if not groups:
-                    return "No groups found in the Backstage Catalog."
-                
-                # Format the response for the agent
-                result = f"Found {len(groups)} group(s) in Backstage Catalog:\n\n"
-                
-                for group in groups:
-                    result += f"- **{group['display_name']}** ({group['entity_ref']})\n"
-                
-                return result
-                
-            else:
-                error_msg = f"Failed to query Backstage Catalog: {response.status_code} - {response.text}"
-                logger.error(error_msg)
-                return f"Error: {error_msg}"
+            return "\n".join(lines) + "\n"
                 
+        except CatalogError as e:
+            error_msg = str(e)
+            logger.error(error_msg)
+            return f"Error: {error_msg}"
         except requests.exceptions.RequestException as e:
             error_msg = f"Network error querying Backstage Catalog: {str(e)}"
             logger.error(error_msg)
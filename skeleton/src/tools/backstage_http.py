@@ -0,0 +1,15 @@
+"""Shared HTTP session for Backstage API calls."""
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# A single session keeps TCP/TLS connections to Backstage open between calls,
+# so only the first request (or the startup warm-up) pays for connecting.
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+
+def get_backstage_session() -> requests.Session:
+    """Return the shared, connection-pooling Backstage HTTP session."""
+    return _session
@@ -6,6 +6,8 @@ from typing import Dict, Any, Optional
 import requests
 
 from ..config import settings
+from ..tracing import tracer
+from .backstage_http import get_backstage_session
 
 logger = logging.getLogger(__name__)
 
@@ -48,12 +50,16 @@ def send_backstage_notification(title: str, description: str, entity_ref: Option
         logger.info(f"Sending notification to Backstage: {title} -> {recipient_entity}")
         logger.debug(f"Notification payload: {notification_payload}")
         
-        response = requests.post(
-            url,
-            headers=headers,
-            json=notification_payload,
-            timeout=30
-        )
+        with tracer.span("http.backstage_notification", {"http.url": url, "notification.recipient": recipient_entity}) as span:
+            response = get_backstage_session().post(
+                url,
+                headers=headers,
+                json=notification_payload,
+                timeout=30
+            )
+            if span is not None:
+                span.set_attribute("http.status_code", response.status_code)
+                span.set_attribute("http.request_bytes", len(response.request.body or b""))
         
         if response.status_code in [200, 201, 202]:
             logger.info(f"Notification sent successfully: {response.status_code}")
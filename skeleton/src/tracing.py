@@ -0,0 +1,368 @@
+"""Lightweight in-process tracing of message analysis stages."""
+
+import contextvars
+import heapq
+import json
+import logging
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .config import Settings, register_settings_listener, settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    """A timed operation within a trace."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_time: float = field(default_factory=time.time)
+    end_time: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    children: List["Span"] = field(default_factory=list)
+
+    @property
+    def duration_ms(self) -> float:
+        end_time = self.end_time if self.end_time is not None else time.time()
+        return round(1000 * (end_time - self.start_time), 1)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = "error"
+        self.attributes["error"] = str(error)
+
+    def iter_spans(self) -> Iterator["Span"]:
+        """Yield this span and all of its descendants."""
+        yield self
+        for child in self.children:
+            yield from child.iter_spans()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+class RingBufferExporter:
+    """Keeps the most recent traces in memory."""
+
+    def __init__(self, size: int):
+        self._traces: Deque[Span] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def export(self, root: Span) -> None:
+        with self._lock:
+            self._traces.append(root)
+
+    def get_traces(self) -> List[Span]:
+        """Return the buffered traces, newest first."""
+        with self._lock:
+            return list(reversed(self._traces))
+
+
+class SlowTraceExporter:
+    """Keeps the N slowest traces seen since startup."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._heap: List[Any] = []
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def export(self, root: Span) -> None:
+        if self.size <= 0:
+            return
+        with self._lock:
+            # The counter breaks ties so spans themselves are never compared
+            self._counter += 1
+            entry = (root.duration_ms, self._counter, root)
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def get_traces(self) -> List[Span]:
+        """Return the kept traces, slowest first."""
+        with self._lock:
+            return [root for _, _, root in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+
+
+class OTLPFileExporter:
+    """Appends finished traces to a file as OTLP/JSON, one trace per line."""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def _otlp_span(self, span: Span) -> Dict[str, Any]:
+        return {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_id or "",
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(int(span.start_time * 1e9)),
+            "endTimeUnixNano": str(int((span.end_time or span.start_time) * 1e9)),
+            "attributes": [self._attribute(key, value) for key, value in span.attributes.items()],
+            "status": {"code": 2 if span.status == "error" else 1},
+        }
+
+    def export(self, root: Span) -> None:
+        document = {
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [self._otlp_span(span) for span in root.iter_spans()],
+                }],
+            }]
+        }
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(document) + "\n")
+        except OSError as e:
+            logger.error(f"Failed to write trace to {self.path}: {e}")
+
+
+class Tracer:
+    """Creates spans and hands finished traces to the exporters.
+
+    The current span is tracked in a context variable, so spans opened with
+    ``span()`` nest under whatever is active in the calling thread.
+    """
+
+    def __init__(self, enabled: bool = True, sample_rate: float = 1.0,
+                 buffer_size: int = 200, slow_trace_count: int = 20,
+                 otlp_file: str = "", service_name: str = ""):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.recent = RingBufferExporter(buffer_size)
+        self.slowest = SlowTraceExporter(slow_trace_count)
+        self.exporters: List[Any] = [self.recent, self.slowest]
+        if otlp_file:
+            self.exporters.append(OTLPFileExporter(otlp_file, service_name))
+        self._current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+    @property
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    def start_span(self, name: str, parent: Optional[Span] = None,
+                   attributes: Optional[Dict[str, Any]] = None,
+                   start_time: Optional[float] = None) -> Optional[Span]:
+        """Create a span under ``parent`` (or the current span) without activating it.
+
+        Returns None when there is no trace to attach it to.
+        """
+        parent = parent or self.current_span
+        if parent is None:
+            return None
+
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id,
+            attributes=dict(attributes or {}),
+        )
+        if start_time is not None:
+            span.start_time = start_time
+        parent.children.append(span)
+        return span
+
+    def activate(self, span: Optional[Span]) -> contextvars.Token:
+        """Make a span current; pass the returned token to ``deactivate``."""
+        return self._current.set(span)
+
+    def deactivate(self, token: contextvars.Token) -> None:
+        try:
+            self._current.reset(token)
+        except ValueError:
+            # Reset from a different context, nothing to restore
+            pass
+
+    def record_span(self, name: str, parent: Optional[Span], start_time: float, end_time: float,
+                    attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Add an already finished span, e.g. for time spent before the trace began."""
+        span = self.start_span(name, parent=parent, attributes=attributes, start_time=start_time)
+        if span is not None:
+            span.end_time = end_time
+        return span
+
+    @contextmanager
+    def trace(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Span]]:
+        """Open the root span of a new trace and export it when it ends."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            yield None
+            return
+
+        root = Span(
+            name=name,
+            trace_id=secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            attributes=dict(attributes or {}),
+        )
+        token = self.activate(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.set_error(e)
+            raise
+        finally:
+            root.end_time = time.time()
+            self.deactivate(token)
+            self._export(root)
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Span]]:
+        """Open a child of the current span; a no-op outside of a trace."""
+        span = self.start_span(name, attributes=attributes)
+        if span is None:
+            yield None
+            return
+
+        token = self.activate(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            span.end_time = time.time()
+            self.deactivate(token)
+
+    def _export(self, root: Span) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(root)
+            except Exception as e:
+                logger.error(f"Trace exporter {type(exporter).__name__} failed: {e}")
+
+    def get_recent_traces(self) -> List[Dict[str, Any]]:
+        return [root.to_dict() for root in self.recent.get_traces()]
+
+    def get_slow_traces(self) -> List[Dict[str, Any]]:
+        return [root.to_dict() for root in self.slowest.get_traces()]
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler that records LLM calls and tool runs as spans.
+
+    Create one handler per agent run, while the span it should nest under is
+    current.
+    """
+
+    def __init__(self, tracer: "Tracer"):
+        self.tracer = tracer
+        self.parent = tracer.current_span
+        self.iteration = 0
+        self._spans: Dict[UUID, Span] = {}
+        self._tokens: Dict[UUID, contextvars.Token] = {}
+
+    def _start(self, run_id: UUID, name: str, attributes: Dict[str, Any]) -> Optional[Span]:
+        span = self.tracer.start_span(name, parent=self.parent, attributes=attributes)
+        if span is not None:
+            self._spans[run_id] = span
+        return span
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None) -> Optional[Span]:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            span.end_time = time.time()
+            if error is not None:
+                span.set_error(error)
+        token = self._tokens.pop(run_id, None)
+        if token is not None:
+            self.tracer.deactivate(token)
+        return span
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self.iteration += 1
+        self._start(run_id, "llm.call", {
+            "llm.iteration": self.iteration,
+            "llm.prompt_chars": sum(len(prompt) for prompt in prompts),
+        })
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._end(run_id)
+        if span is None:
+            return
+
+        token_usage = (response.llm_output or {}).get("token_usage", {})
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            if key in token_usage:
+                span.set_attribute(f"llm.{key}", token_usage[key])
+        span.set_attribute("llm.completion_chars", sum(
+            len(generation.text) for generations in response.generations for generation in generations
+        ))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._start(run_id, f"tool.{serialized.get('name', 'unknown')}", {
+            "tool.input_chars": len(input_str or ""),
+        })
+        if span is not None:
+            # Let spans opened inside the tool (e.g. HTTP calls) nest under it
+            self._tokens[run_id] = self.tracer.activate(span)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._end(run_id)
+        if span is not None:
+            span.set_attribute("tool.output_chars", len(str(output)))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+
+# Global tracer instance
+tracer = Tracer(
+    enabled=settings.tracing_enabled,
+    sample_rate=settings.tracing_sample_rate,
+    buffer_size=settings.tracing_buffer_size,
+    slow_trace_count=settings.tracing_slow_trace_count,
+    otlp_file=settings.tracing_otlp_file,
+    service_name=settings.service_name,
+)
+
+
+def _apply_settings(updated: Settings) -> None:
+    tracer.enabled = updated.tracing_enabled
+    tracer.sample_rate = updated.tracing_sample_rate
+
+
+register_settings_listener(_apply_settings)
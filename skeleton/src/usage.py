@@ -0,0 +1,210 @@
+"""Token usage accounting for AI agent runs."""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .config import Settings, register_settings_listener, settings
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used when the server doesn't report usage
+CHARS_PER_TOKEN = 4
+
+NOTIFICATION_TOOL_NAME = "send_backstage_notification"
+
+
+@dataclass
+class RunUsage:
+    """Token usage of a single agent run."""
+
+    topic: str = ""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    llm_calls: int = 0
+    iterations: int = 0
+    estimated: bool = False
+    recipients: List[str] = field(default_factory=list)
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler that counts tokens, iterations and recipients.
+
+    Create one handler per agent run and read ``usage`` once it finishes.
+    """
+
+    def __init__(self, topic: str):
+        self.usage = RunUsage(topic=topic)
+        self._prompt_chars: Dict[UUID, int] = {}
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self.usage.llm_calls += 1
+        self._prompt_chars[run_id] = sum(len(prompt) for prompt in prompts)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt_chars = self._prompt_chars.pop(run_id, 0)
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+
+        if token_usage:
+            self.usage.prompt_tokens += token_usage.get("prompt_tokens", 0)
+            self.usage.completion_tokens += token_usage.get("completion_tokens", 0)
+        else:
+            # Some servers don't return usage; fall back to an estimate
+            completion_chars = sum(
+                len(generation.text) for generations in response.generations for generation in generations
+            )
+            self.usage.prompt_tokens += prompt_chars // CHARS_PER_TOKEN
+            self.usage.completion_tokens += completion_chars // CHARS_PER_TOKEN
+            self.usage.estimated = True
+
+    def on_agent_action(self, action, *, run_id: UUID, **kwargs: Any) -> None:
+        self.usage.iterations += 1
+
+    def on_agent_finish(self, finish, *, run_id: UUID, **kwargs: Any) -> None:
+        self.usage.iterations += 1
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if serialized.get("name") != NOTIFICATION_TOOL_NAME:
+            return
+        try:
+            entity_ref = json.loads(input_str).get("entity_ref")
+        except (ValueError, AttributeError):
+            entity_ref = None
+        self.usage.recipients.append(entity_ref or settings.notification_recipient_entity)
+
+
+class UsageTracker:
+    """Aggregates run usage over a rolling window and enforces token budgets."""
+
+    def __init__(self, window_seconds: int, token_budget: int = 0, topic_token_budget: int = 0):
+        """Initialize the usage tracker.
+
+        Args:
+            window_seconds: Length of the rolling window
+            token_budget: Maximum tokens across all topics per window (0 for unlimited)
+            topic_token_budget: Maximum tokens for a single topic per window (0 for unlimited)
+        """
+        self.window_seconds = window_seconds
+        self.token_budget = token_budget
+        self.topic_token_budget = topic_token_budget
+        self._runs: Deque[RunUsage] = deque()
+        self._lifetime = RunUsage()
+        self._messages = 0
+        self._over_budget = 0
+        self._lock = threading.Lock()
+
+    def _expire(self) -> None:
+        """Drop runs older than the window. Must be called with the lock held."""
+        cutoff = time.time() - self.window_seconds
+        while self._runs and self._runs[0].timestamp < cutoff:
+            self._runs.popleft()
+
+    def record(self, usage: RunUsage) -> None:
+        """Add a finished run to the window."""
+        with self._lock:
+            self._runs.append(usage)
+            self._messages += 1
+            self._lifetime.prompt_tokens += usage.prompt_tokens
+            self._lifetime.completion_tokens += usage.completion_tokens
+            self._lifetime.llm_calls += usage.llm_calls
+            self._lifetime.iterations += usage.iterations
+            self._expire()
+
+        logger.info(
+            f"Agent run used {usage.total_tokens} tokens "
+            f"({usage.prompt_tokens} prompt, {usage.completion_tokens} completion) "
+            f"in {usage.iterations} iteration(s) for topic '{usage.topic}'"
+        )
+
+    def within_budget(self, topic: str) -> bool:
+        """Return False if the window's total or per-topic budget is used up."""
+        with self._lock:
+            self._expire()
+            if self.token_budget:
+                if sum(run.total_tokens for run in self._runs) >= self.token_budget:
+                    self._over_budget += 1
+                    return False
+            if self.topic_token_budget:
+                if sum(run.total_tokens for run in self._runs if run.topic == topic) >= self.topic_token_budget:
+                    self._over_budget += 1
+                    return False
+            return True
+
+    @staticmethod
+    def _totals(runs: List[RunUsage]) -> Dict[str, Any]:
+        return {
+            "messages": len(runs),
+            "prompt_tokens": sum(run.prompt_tokens for run in runs),
+            "completion_tokens": sum(run.completion_tokens for run in runs),
+            "total_tokens": sum(run.total_tokens for run in runs),
+            "iterations": sum(run.iterations for run in runs),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return window totals by topic and recipient, and lifetime totals."""
+        with self._lock:
+            self._expire()
+            runs = list(self._runs)
+
+            by_topic: Dict[str, List[RunUsage]] = {}
+            by_recipient: Dict[str, List[RunUsage]] = {}
+            for run in runs:
+                by_topic.setdefault(run.topic, []).append(run)
+                # A run that notified several recipients counts towards each
+                for recipient in set(run.recipients):
+                    by_recipient.setdefault(recipient, []).append(run)
+
+            window = self._totals(runs)
+            return {
+                "window_seconds": self.window_seconds,
+                "window": window,
+                "by_topic": {topic: self._totals(topic_runs) for topic, topic_runs in by_topic.items()},
+                "by_recipient": {
+                    recipient: self._totals(recipient_runs) for recipient, recipient_runs in by_recipient.items()
+                },
+                "budget": {
+                    "tokens_per_window": self.token_budget,
+                    "topic_tokens_per_window": self.topic_token_budget,
+                    "remaining": max(0, self.token_budget - window["total_tokens"]) if self.token_budget else None,
+                    "over_budget_messages": self._over_budget,
+                },
+                "lifetime": {
+                    "messages": self._messages,
+                    "prompt_tokens": self._lifetime.prompt_tokens,
+                    "completion_tokens": self._lifetime.completion_tokens,
+                    "total_tokens": self._lifetime.total_tokens,
+                    "llm_calls": self._lifetime.llm_calls,
+                    "iterations": self._lifetime.iterations,
+                    "avg_tokens_per_message": round(self._lifetime.total_tokens / self._messages, 1) if self._messages else 0.0,
+                },
+                "estimated": any(run.estimated for run in runs),
+            }
+
+
+# Global usage tracker instance
+usage_tracker = UsageTracker(
+    window_seconds=settings.usage_window_seconds,
+    token_budget=settings.usage_token_budget_per_window,
+    topic_token_budget=settings.usage_topic_token_budget_per_window,
+)
+
+
+def _apply_settings(updated: Settings) -> None:
+    usage_tracker.window_seconds = updated.usage_window_seconds
+    usage_tracker.token_budget = updated.usage_token_budget_per_window
+    usage_tracker.topic_token_budget = updated.usage_topic_token_budget_per_window
+
+
+register_settings_listener(_apply_settings)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Simple web server for health checks and status endpoints."""
 
+import hmac
 import json
 import threading
 from http.server import HTTPServer, BaseHTTPRequestHandler
@@ -8,6 +9,9 @@ from typing import Dict, Any, Optional
 
 import structlog
 
+from .config import get_runtime_config, settings, update_settings
+from .tracing import tracer
+
 logger = structlog.get_logger()
 
 
@@ -24,9 +28,54 @@ class HealthRequestHandler(BaseHTTPRequestHandler):
             self._handle_health()
         elif self.path == '/status':
             self._handle_status()
+        elif self.path == '/ready':
+            self._handle_ready()
+        elif self.path == '/traces':
+            self._send_json(200, {"traces": tracer.get_recent_traces()})
+        elif self.path == '/traces/slow':
+            self._send_json(200, {"traces": tracer.get_slow_traces()})
+        elif self.path == '/config':
+            self._send_json(200, get_runtime_config())
         else:
             self._handle_not_found()
     
+    def do_PUT(self):
+        """Handle PUT requests."""
+        if self.path == '/config':
+            self._handle_update_config()
+        else:
+            self._handle_not_found()
+    
+    def _handle_update_config(self):
+        """Validate and apply runtime setting changes from a JSON body."""
+        # Fail closed: without a configured token nobody may change settings
+        if not settings.admin_token:
+            self._send_json(403, {"error": "Runtime configuration is disabled; set ADMIN_TOKEN to enable it"})
+            return
+        
+        authorization = self.headers.get('Authorization', '')
+        if not hmac.compare_digest(authorization.encode(), f"Bearer {settings.admin_token}".encode()):
+            self._send_json(401, {"error": "Unauthorized"})
+            return
+        
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            changes = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(changes, dict):
+                raise ValueError("Request body must be a JSON object")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid request body: {e}"})
+            return
+        
+        try:
+            effective = update_settings(changes)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        
+        logger.info("Runtime settings updated", changes=changes)
+        self._send_json(200, effective)
+    
     def _handle_health(self):
         """Handle health check requests."""
         try:
@@ -49,10 +98,28 @@ class HealthRequestHandler(BaseHTTPRequestHandler):
             error_response = json.dumps({"status": "error", "message": str(e)})
             self.wfile.write(error_response.encode())
     
+    def _handle_ready(self):
+        """Handle readiness requests; 503 until the warm-up has finished."""
+        try:
+            readiness = self.service_instance.readiness_check()
+            self._send_json(200 if readiness.get("status") == "ready" else 503, readiness)
+        except Exception as e:
+            logger.error("Error handling readiness check", error=str(e))
+            self._send_json(500, {"status": "error", "message": str(e)})
+    
     def _handle_status(self):
         """Handle status requests (alias for health)."""
         self._handle_health()
     
+    def _send_json(self, status_code: int, data: Any):
+        """Send a JSON response."""
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        
+        response = json.dumps(data, indent=2, default=str)
+        self.wfile.write(response.encode())
+    
     def _handle_not_found(self):
         """Handle 404 responses."""
         self.send_response(404)
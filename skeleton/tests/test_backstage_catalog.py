@@ -0,0 +1,170 @@
+"""Tests for the Backstage Catalog tool."""
+
+import threading
+import time
+
+import pytest
+
+from src.config import settings
+from src.tools import backstage_catalog
+from src.tools.backstage_catalog import BackstageCatalogTool, CatalogError, rank_groups
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self._body = body
+        self.status_code = status_code
+        self.content = str(body).encode()
+        self.text = str(body)
+
+    def json(self):
+        return self._body
+
+
+class FakeSession:
+    """Serves canned catalog pages and records the query parameters of each request."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.requests.append(dict(params))
+        return self.responses.pop(0)
+
+
+def entity(name, title="", namespace="default"):
+    return {"metadata": {"name": name, "namespace": namespace, "title": title}}
+
+
+def group(name, title=""):
+    return {"entity_ref": f"group:default/{name}", "display_name": title or name}
+
+
+@pytest.fixture
+def session(monkeypatch):
+    def install(*responses):
+        fake = FakeSession(responses)
+        monkeypatch.setattr(backstage_catalog, "get_backstage_session", lambda: fake)
+        return fake
+    return install
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(backstage_catalog, "_group_cache", backstage_catalog._GroupCache())
+
+
+class TestIterGroups:
+    def test_follows_the_cursor_across_pages(self, session, monkeypatch):
+        monkeypatch.setattr(settings, "catalog_page_size", 2)
+        fake = session(
+            FakeResponse({"items": [entity("alpha", "Alpha Team"), entity("beta", namespace="ops")],
+                          "pageInfo": {"nextCursor": "page-2"}}),
+            FakeResponse({"items": [entity("gamma")], "pageInfo": {}}),
+        )
+
+        groups = list(BackstageCatalogTool().iter_groups())
+
+        assert groups == [
+            {"entity_ref": "group:default/alpha", "display_name": "Alpha Team"},
+            {"entity_ref": "group:ops/beta", "display_name": "beta"},
+            {"entity_ref": "group:default/gamma", "display_name": "gamma"},
+        ]
+        first, second = fake.requests
+        assert first["filter"] == "kind=group"
+        assert first["limit"] == 2
+        assert first["fields"] == backstage_catalog.GROUP_FIELDS
+        # Later pages carry the cursor instead of the filter and order
+        assert second == {"cursor": "page-2", "fields": backstage_catalog.GROUP_FIELDS, "limit": 2}
+
+    def test_error_status_raises(self, session):
+        session(FakeResponse({"error": "forbidden"}, status_code=403))
+        with pytest.raises(CatalogError):
+            list(BackstageCatalogTool().iter_groups())
+
+
+class TestRankGroups:
+    def test_orders_groups_by_matching_keywords(self):
+        groups = [group("platform"), group("payments", "Payments Team"), group("orders-payments")]
+
+        ranked = rank_groups(groups, "Refund event: payments service, orders")
+
+        assert [item["entity_ref"] for item in ranked] == [
+            "group:default/orders-payments", "group:default/payments", "group:default/platform"
+        ]
+
+    def test_keeps_catalog_order_without_keywords(self):
+        groups = [group("beta"), group("alpha")]
+        assert rank_groups(groups, "") == groups
+        assert rank_groups(groups, "a b") == groups
+
+
+class TestCatalogTool:
+    def test_output_is_capped_to_the_most_relevant_groups(self, session, monkeypatch):
+        monkeypatch.setattr(settings, "catalog_max_groups", 2)
+        session(FakeResponse({
+            "items": [entity("alpha"), entity("billing"), entity("payments"), entity("zeta")],
+            "pageInfo": {},
+        }))
+
+        output = BackstageCatalogTool()._run("payments")
+
+        assert output.startswith("Found 4 group(s) in Backstage Catalog, showing the 2 most relevant:")
+        assert output.index("group:default/payments") < output.index("group:default/alpha")
+        assert "group:default/zeta" not in output
+
+
+class TestGroupCache:
+    def test_fetch_is_served_from_cache_while_fresh(self, session):
+        fake = session(FakeResponse({"items": [entity("alpha")], "pageInfo": {}}))
+        tool = BackstageCatalogTool()
+
+        assert tool.fetch_groups() == tool.fetch_groups() == [group("alpha")]
+        assert len(fake.requests) == 1
+
+    def test_failed_fetch_is_not_retried_during_the_backoff(self, session, monkeypatch):
+        monkeypatch.setattr(settings, "catalog_failure_backoff_seconds", 60)
+        fake = session(FakeResponse({"error": "unavailable"}, status_code=503))
+        tool = BackstageCatalogTool()
+
+        with pytest.raises(CatalogError):
+            tool.fetch_groups()
+        with pytest.raises(CatalogError, match="not retrying yet"):
+            tool.fetch_groups()
+        assert len(fake.requests) == 1
+
+        # The prompt path doesn't start a refresh either
+        assert tool.cached_groups() is None
+
+    def test_cached_groups_never_waits_and_refreshes_in_the_background(self, session, monkeypatch):
+        monkeypatch.setattr(settings, "catalog_cache_ttl_seconds", 0)
+        fake = session(
+            FakeResponse({"items": [entity("alpha")], "pageInfo": {}}),
+            FakeResponse({"items": [entity("beta")], "pageInfo": {}}),
+        )
+        # Hold every request until the caller has been answered
+        release = threading.Semaphore(0)
+        get = fake.get
+        monkeypatch.setattr(fake, "get", lambda *args, **kwargs: release.acquire(timeout=5) and get(*args, **kwargs))
+        tool = BackstageCatalogTool()
+        cache = backstage_catalog._group_cache
+
+        def refreshed_to(groups):
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                if cache.get_stale() == groups and cache.begin_refresh():
+                    cache.end_refresh()
+                    return True
+                time.sleep(0.01)
+            return False
+
+        # Nothing fetched yet: returns at once and fetches in the background
+        assert tool.cached_groups() is None
+        release.release()
+        assert refreshed_to([group("alpha")])
+
+        # With a zero TTL the list is always stale: the last one is returned and a refresh started
+        assert tool.cached_groups() == [group("alpha")]
+        release.release()
+        assert refreshed_to([group("beta")])
@@ -0,0 +1,121 @@
+"""Tests for runtime setting updates and PUT /config."""
+
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src import config
+from src.config import RUNTIME_TUNABLE_FIELDS, get_runtime_config, settings, update_settings
+from src.web_server import WebServer
+
+
+@pytest.fixture(autouse=True)
+def restore_settings():
+    original = get_runtime_config()
+    yield
+    update_settings(original)
+
+
+class TestUpdateSettings:
+    def test_applies_changes_and_notifies_listeners(self, monkeypatch):
+        seen = []
+        monkeypatch.setattr(config, "_listeners", [lambda updated: seen.append(updated.scheduler_workers)])
+
+        effective = update_settings({"scheduler_workers": 3, "catalog_page_size": 50})
+
+        assert effective["scheduler_workers"] == 3
+        assert settings.scheduler_workers == 3
+        assert settings.catalog_page_size == 50
+        assert seen == [3]
+
+    def test_rejects_settings_that_are_not_tunable(self):
+        kafka_broker = settings.kafka_broker
+        before = get_runtime_config()
+        with pytest.raises(ValueError, match="kafka_broker"):
+            update_settings({"kafka_broker": "elsewhere:9092", "scheduler_workers": 3})
+
+        assert "kafka_broker" not in RUNTIME_TUNABLE_FIELDS
+        assert settings.kafka_broker == kafka_broker
+        assert get_runtime_config() == before
+
+    @pytest.mark.parametrize("changes", [
+        {"scheduler_workers": 0},
+        {"scheduler_workers": 100000},
+        {"catalog_page_size": 10 ** 6},
+        {"ai_tier_confidence_threshold": 1.5},
+        {"tracing_sample_rate": -0.1},
+    ])
+    def test_rejects_out_of_range_values(self, changes):
+        before = get_runtime_config()
+        with pytest.raises(ValueError):
+            update_settings(changes)
+        assert get_runtime_config() == before
+
+    def test_one_invalid_value_rejects_the_whole_update(self):
+        before = get_runtime_config()
+        with pytest.raises(ValueError):
+            update_settings({"catalog_page_size": 50, "scheduler_workers": -1})
+        assert get_runtime_config() == before
+
+    def test_readers_see_all_old_or_all_new_values(self):
+        old_settings_dict = settings.__dict__
+        update_settings({"catalog_page_size": 50, "catalog_max_groups": 5})
+
+        # The attribute dictionary is replaced, not mutated in place
+        assert settings.__dict__ is not old_settings_dict
+        assert (old_settings_dict["catalog_page_size"], old_settings_dict["catalog_max_groups"]) != (50, 5)
+
+
+class _Service:
+    def health_check(self):
+        return {"status": "healthy"}
+
+    def readiness_check(self):
+        return {"status": "ready"}
+
+
+@pytest.fixture
+def server():
+    web_server = WebServer(_Service(), port=0, host="127.0.0.1")
+    web_server.start()
+    yield f"http://127.0.0.1:{web_server.server.server_address[1]}"
+    web_server.stop()
+
+
+def put_config(base_url, changes, token=None):
+    request = urllib.request.Request(f"{base_url}/config", data=json.dumps(changes).encode(), method="PUT")
+    if token is not None:
+        request.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+class TestPutConfig:
+    def test_disabled_without_an_admin_token(self, server, monkeypatch):
+        monkeypatch.setattr(settings, "admin_token", "")
+        status, _ = put_config(server, {"scheduler_workers": 3}, token="")
+        assert status == 403
+        assert settings.scheduler_workers != 3
+
+    def test_wrong_token_is_unauthorized(self, server, monkeypatch):
+        monkeypatch.setattr(settings, "admin_token", "secret")
+        assert put_config(server, {"scheduler_workers": 3})[0] == 401
+        assert put_config(server, {"scheduler_workers": 3}, token="guess")[0] == 401
+        assert settings.scheduler_workers != 3
+
+    def test_valid_request_is_applied(self, server, monkeypatch):
+        monkeypatch.setattr(settings, "admin_token", "secret")
+        status, body = put_config(server, {"scheduler_workers": 3}, token="secret")
+        assert status == 200
+        assert body["scheduler_workers"] == 3
+
+    def test_invalid_value_is_a_bad_request(self, server, monkeypatch):
+        monkeypatch.setattr(settings, "admin_token", "secret")
+        status, body = put_config(server, {"scheduler_workers": 100000}, token="secret")
+        assert status == 400
+        assert "scheduler_workers" in body["error"]
@@ -0,0 +1,80 @@
+"""Tests for the rule-based fallback and DigestNotifier."""
+
+import time
+
+import pytest
+
+from src import fallback
+from src.fallback import DigestNotifier, analyze_without_llm
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Capture digest notifications instead of sending them to Backstage."""
+    notifications = []
+
+    def send(title, description):
+        notifications.append((title, description))
+        return "Notification sent successfully to Backstage (status: 201)"
+
+    monkeypatch.setattr(fallback, "send_backstage_notification", send)
+    return notifications
+
+
+def metadata(offset: int):
+    return {"topic": "unknown", "partition": 0, "offset": offset}
+
+
+class TestAnalyzeWithoutLlm:
+    def test_classifies_common_payloads(self):
+        assert analyze_without_llm("").startswith("Missing context")
+        assert analyze_without_llm('{"type": "refund"').startswith("Data format issue")
+        assert analyze_without_llm("[1, 2]").startswith("Data format issue")
+        assert "'refund'" in analyze_without_llm('{"type": "refund"}')
+        assert analyze_without_llm('{"amount": 3}').startswith("Missing context")
+
+
+class TestDigestNotifier:
+    def test_sends_once_full(self, sent):
+        digest = DigestNotifier(max_messages=3, max_age_seconds=3600)
+        for offset in range(2):
+            digest.add("{}", metadata(offset))
+        assert sent == [] and len(digest) == 2
+
+        digest.add("{}", metadata(2))
+        assert len(sent) == 1
+        assert "(digest of 3)" in sent[0][0]
+        assert "unknown[0]@2" in sent[0][1]
+        assert len(digest) == 0
+
+    def test_timer_sends_old_digest_without_further_messages(self, sent):
+        digest = DigestNotifier(max_messages=100, max_age_seconds=0.05)
+        digest.add("{}", metadata(0))
+
+        deadline = time.monotonic() + 2
+        while not sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(sent) == 1
+        assert len(digest) == 0
+
+    def test_flush_without_entries_sends_nothing(self, sent):
+        assert DigestNotifier(max_messages=3, max_age_seconds=3600).flush()
+        assert sent == []
+
+    def test_failed_send_keeps_entries_for_a_retry(self, monkeypatch, sent):
+        digest = DigestNotifier(max_messages=2, max_age_seconds=3600)
+        monkeypatch.setattr(fallback, "send_backstage_notification", lambda title, description: "Error: 503")
+        digest.add("{}", metadata(0))
+        digest.add("{}", metadata(1))
+        assert len(digest) == 2
+
+        # Adding more doesn't retry before the retry delay
+        digest.add("{}", metadata(2))
+        assert len(digest) == 3
+
+        monkeypatch.setattr(fallback, "send_backstage_notification",
+                            lambda title, description: sent.append((title, description)) or "sent")
+        assert digest.flush()
+        assert len(digest) == 0
+        assert "(digest of 3)" in sent[0][0]
+        assert sent[0][1].index("@0") < sent[0][1].index("@2")
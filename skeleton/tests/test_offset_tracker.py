@@ -0,0 +1,119 @@
+"""Tests for OffsetTracker."""
+
+from src.kafka_consumer import KafkaMessage, OffsetTracker
+
+TOPIC = "unknown"
+
+
+def make_message(offset: int, partition: int = 0) -> KafkaMessage:
+    return KafkaMessage(
+        topic=TOPIC, partition=partition, offset=offset, key=None,
+        value="{}", timestamp=0, headers={}
+    )
+
+
+def receive(tracker: OffsetTracker, *offsets: int, partition: int = 0):
+    messages = [make_message(offset, partition) for offset in offsets]
+    for message in messages:
+        tracker.track(message)
+    return messages
+
+
+class TestOffsetTracker:
+    def test_commits_past_all_completed_messages(self):
+        tracker = OffsetTracker()
+        for message in receive(tracker, 0, 1, 2):
+            assert tracker.started(message)
+            tracker.completed(message)
+
+        assert tracker.committable() == {(TOPIC, 0): 3}
+
+    def test_out_of_order_completion_holds_back_the_lowest_pending_offset(self):
+        tracker = OffsetTracker()
+        first, second, third = receive(tracker, 10, 11, 12)
+        for message in (first, second, third):
+            tracker.started(message)
+
+        tracker.completed(third)
+        tracker.completed(second)
+        assert tracker.committable() == {(TOPIC, 0): 10}
+
+        tracker.completed(first)
+        assert tracker.committable() == {(TOPIC, 0): 13}
+
+    def test_queued_messages_are_not_committable(self):
+        tracker = OffsetTracker()
+        first, _ = receive(tracker, 0, 1)
+        tracker.started(first)
+        tracker.completed(first)
+
+        assert tracker.committable() == {(TOPIC, 0): 1}
+
+    def test_partitions_are_tracked_independently(self):
+        tracker = OffsetTracker()
+        (p0,) = receive(tracker, 5, partition=0)
+        receive(tracker, 7, partition=1)
+        tracker.started(p0)
+        tracker.completed(p0)
+
+        assert tracker.committable() == {(TOPIC, 0): 6, (TOPIC, 1): 7}
+        assert tracker.committable([(TOPIC, 1)]) == {(TOPIC, 1): 7}
+
+    def test_unchanged_offsets_are_only_skipped_once_acknowledged(self):
+        tracker = OffsetTracker()
+        (message,) = receive(tracker, 0)
+        tracker.started(message)
+        tracker.completed(message)
+
+        # An unacknowledged (e.g. failed asynchronous) commit is sent again
+        assert tracker.committable() == {(TOPIC, 0): 1}
+
+        tracker.mark_committed({(TOPIC, 0): 1})
+        assert tracker.committable() == {}
+        assert tracker.committable(include_unchanged=True) == {(TOPIC, 0): 1}
+
+    def test_revoked_partition_messages_are_skipped(self):
+        tracker = OffsetTracker()
+        (message,) = receive(tracker, 0)
+        tracker.forget([(TOPIC, 0)])
+
+        assert not tracker.started(message)
+        assert tracker.committable() == {}
+
+    def test_forget_ignores_late_completion_of_timed_out_message(self):
+        tracker = OffsetTracker()
+        (stale,) = receive(tracker, 3)
+        tracker.started(stale)
+
+        # The drain timed out with the message in flight, then the partition
+        # came back and the message was redelivered
+        assert not tracker.wait_until_idle(timeout=0)
+        tracker.forget([(TOPIC, 0)])
+        (redelivered,) = receive(tracker, 3)
+        tracker.started(redelivered)
+
+        tracker.completed(stale)
+        assert tracker.committable() == {(TOPIC, 0): 3}
+        assert tracker.get_stats()["in_flight"] == 1
+
+        tracker.completed(redelivered)
+        assert tracker.committable() == {(TOPIC, 0): 4}
+        assert tracker.wait_until_idle(timeout=0)
+
+    def test_late_acknowledgement_after_forget_is_ignored(self):
+        tracker = OffsetTracker()
+        (message,) = receive(tracker, 0)
+        tracker.started(message)
+        tracker.completed(message)
+        tracker.forget([(TOPIC, 0)])
+
+        tracker.mark_committed({(TOPIC, 0): 1})
+        assert tracker.get_stats()["committed"] == {}
+
+    def test_wait_until_idle_only_considers_given_partitions(self):
+        tracker = OffsetTracker()
+        (busy,) = receive(tracker, 0, partition=0)
+        tracker.started(busy)
+
+        assert tracker.wait_until_idle([(TOPIC, 1)], timeout=0)
+        assert not tracker.wait_until_idle([(TOPIC, 0)], timeout=0)
@@ -0,0 +1,80 @@
+"""Tests for SpeculativePrefetcher."""
+
+import threading
+
+from src.prefetch import SpeculativePrefetcher
+
+
+class TestSpeculativePrefetcher:
+    def test_taken_prefetch_is_a_hit(self):
+        prefetcher = SpeculativePrefetcher(max_workers=2)
+        with prefetcher.scope():
+            prefetcher.start("catalog", lambda: "groups")
+            future = prefetcher.take("catalog")
+            assert future.result(timeout=5) == "groups"
+
+        stats = prefetcher.get_stats()
+        assert stats["started"] == 1
+        assert stats["hits"] == 1
+        assert stats["misses"] == 0
+        assert stats["discarded"] == 0
+        assert stats["hit_rate"] == 1.0
+
+    def test_lookup_without_a_prefetch_is_a_miss_unless_cached(self):
+        prefetcher = SpeculativePrefetcher(max_workers=2)
+        with prefetcher.scope():
+            assert prefetcher.take("catalog") is None
+            assert prefetcher.take("catalog", cached=True) is None
+
+        stats = prefetcher.get_stats()
+        assert stats["misses"] == 1
+        assert stats["cache_hits"] == 1
+        assert stats["hit_rate"] == 0.0
+
+    def test_cache_hits_are_left_out_of_the_hit_rate(self):
+        prefetcher = SpeculativePrefetcher(max_workers=2)
+        with prefetcher.scope():
+            prefetcher.start("catalog", lambda: "groups")
+            prefetcher.take("catalog")
+            prefetcher.take("catalog", cached=True)
+            prefetcher.take("catalog", cached=True)
+
+        assert prefetcher.get_stats()["hit_rate"] == 1.0
+
+    def test_a_prefetch_can_only_be_taken_once(self):
+        prefetcher = SpeculativePrefetcher(max_workers=2)
+        with prefetcher.scope():
+            prefetcher.start("catalog", lambda: "groups")
+            assert prefetcher.take("catalog") is not None
+            assert prefetcher.take("catalog") is None
+
+        assert prefetcher.get_stats()["misses"] == 1
+
+    def test_untaken_prefetches_are_discarded_when_the_scope_ends(self):
+        prefetcher = SpeculativePrefetcher(max_workers=2)
+        with prefetcher.scope():
+            prefetcher.start("catalog", lambda: "groups")
+            # Starting the same key twice in a scope is a no-op
+            prefetcher.start("catalog", lambda: "groups")
+
+        stats = prefetcher.get_stats()
+        assert stats["started"] == 1
+        assert stats["discarded"] == 1
+
+    def test_start_outside_a_scope_does_nothing(self):
+        prefetcher = SpeculativePrefetcher(max_workers=2)
+        prefetcher.start("catalog", lambda: "groups")
+        assert prefetcher.get_stats()["started"] == 0
+
+    def test_resize_keeps_running_prefetches(self):
+        prefetcher = SpeculativePrefetcher(max_workers=2)
+        release = threading.Event()
+        with prefetcher.scope():
+            prefetcher.start("slow", lambda: release.wait(5) and "done")
+            prefetcher.resize(4)
+            prefetcher.start("fast", lambda: "groups")
+            release.set()
+            assert prefetcher.take("slow").result(timeout=5) == "done"
+            assert prefetcher.take("fast").result(timeout=5) == "groups"
+
+        assert prefetcher.get_stats()["workers"] == 4
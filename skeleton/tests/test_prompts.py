@@ -0,0 +1,74 @@
+"""Tests for the cacheable agent prompt layout."""
+
+from src.prompts import (
+    DEFAULT_RECIPIENT,
+    QUESTION_TEMPLATE,
+    PrefixTracker,
+    build_agent_suffix,
+    format_catalog_groups,
+    hash_prefix,
+)
+
+
+def group(name, title=""):
+    return {"entity_ref": f"group:default/{name}", "display_name": title or name}
+
+
+class TestBuildAgentSuffix:
+    def test_static_content_comes_before_the_question(self):
+        suffix = build_agent_suffix([group("payments")], max_groups=10)
+
+        assert suffix.endswith(QUESTION_TEMPLATE)
+        static = suffix[:-len(QUESTION_TEMPLATE)]
+        assert "group:default/payments" in static
+        assert DEFAULT_RECIPIENT in static
+        assert "{input}" not in static
+
+    def test_group_order_does_not_change_the_suffix(self):
+        groups = [group("payments"), group("orders"), group("shipping")]
+        assert build_agent_suffix(groups, 10) == build_agent_suffix(list(reversed(groups)), 10)
+
+    def test_groups_are_capped_and_the_rest_counted(self):
+        groups = [group(f"team-{index:02d}") for index in range(5)]
+
+        text = format_catalog_groups(groups, max_groups=2)
+
+        assert "group:default/team-00" in text and "group:default/team-01" in text
+        assert "group:default/team-02" not in text
+        assert "3 more group(s)" in text
+
+    def test_without_groups_the_agent_is_told_to_use_the_tool(self):
+        assert "catalog tool" in format_catalog_groups(None, 10)
+        assert "catalog tool" in format_catalog_groups([], 10)
+
+    def test_braces_in_group_names_are_escaped(self):
+        suffix = build_agent_suffix([group("odd", "Team {x}")], max_groups=10)
+
+        assert "Team {{x}}" in suffix
+        assert suffix.format(input="question", agent_scratchpad="").count("Team {x}") == 1
+
+
+class TestPrefixTracker:
+    def test_reuse_rate_counts_runs_with_the_same_prefix_as_the_previous_run(self):
+        tracker = PrefixTracker()
+        assert tracker.update("prefix one")
+        assert not tracker.update("prefix one")
+        for _ in range(3):
+            assert tracker.record_use() == hash_prefix("prefix one")
+
+        assert tracker.update("prefix two")
+        tracker.record_use()
+
+        stats = tracker.get_stats()
+        assert stats["sha256"] == hash_prefix("prefix two")
+        assert stats["chars"] == len("prefix two")
+        assert stats["changes"] == 2
+        assert stats["runs"] == 4
+        assert stats["uses_since_change"] == 1
+        # The first run and the run after the change had nothing to reuse
+        assert stats["reuse_rate"] == 0.5
+
+    def test_empty_tracker(self):
+        stats = PrefixTracker().get_stats()
+        assert stats["runs"] == 0
+        assert stats["reuse_rate"] == 0.0
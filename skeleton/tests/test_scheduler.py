@@ -0,0 +1,124 @@
+"""Tests for PriorityScheduler."""
+
+from collections import Counter
+
+from src.kafka_consumer import KafkaMessage
+from src.scheduler import PriorityScheduler, header_severity
+
+
+def make_message(offset: int, severity: str = "", partition: int = 0) -> KafkaMessage:
+    return KafkaMessage(
+        topic="unknown", partition=partition, offset=offset, key=None, value="{}",
+        timestamp=0, headers={"severity": severity.encode()} if severity else {}
+    )
+
+
+def make_scheduler(**kwargs) -> PriorityScheduler:
+    options = {
+        "class_weights": {"critical": 8, "high": 4, "normal": 2, "low": 1},
+        "priority_functions": [header_severity("severity")],
+        "max_wait_seconds": 300.0,
+    }
+    options.update(kwargs)
+    return PriorityScheduler(**options)
+
+
+def drain(scheduler: PriorityScheduler, count: int):
+    return [scheduler.get(timeout=0) for _ in range(count)]
+
+
+class TestPriorityScheduler:
+    def test_classifies_by_severity_header_and_aliases(self):
+        scheduler = make_scheduler()
+        assert scheduler.classify(make_message(0, "critical")) == "critical"
+        assert scheduler.classify(make_message(0, "ERROR")) == "high"
+        assert scheduler.classify(make_message(0, "unheard-of")) == "normal"
+        assert scheduler.classify(make_message(0)) == "normal"
+
+    def test_weighted_round_robin_serves_classes_in_proportion_to_weight(self):
+        scheduler = make_scheduler()
+        offset = 0
+        for severity in ("critical", "high", "normal", "low"):
+            for _ in range(100):
+                scheduler.put(make_message(offset, severity))
+                offset += 1
+
+        # One full round of the weights (8 + 4 + 2 + 1), repeated
+        served = Counter(item.priority_class for item in drain(scheduler, 15 * 4))
+        assert served == {"critical": 32, "high": 16, "normal": 8, "low": 4}
+
+    def test_round_robin_is_smooth_rather_than_bursty(self):
+        scheduler = make_scheduler(class_weights={"high": 2, "low": 1})
+        for offset in range(6):
+            scheduler.put(make_message(offset, "high" if offset < 3 else "info"))
+
+        order = [item.priority_class for item in drain(scheduler, 3)]
+        assert order == ["high", "low", "high"]
+
+    def test_messages_within_a_class_are_served_in_arrival_order(self):
+        scheduler = make_scheduler()
+        for offset in range(5):
+            scheduler.put(make_message(offset))
+
+        assert [item.message.offset for item in drain(scheduler, 5)] == list(range(5))
+
+    def test_overdue_message_is_promoted_ahead_of_higher_classes(self):
+        scheduler = make_scheduler(max_wait_seconds=0.0)
+        scheduler.put(make_message(0, "debug"))
+        for offset in range(1, 5):
+            scheduler.put(make_message(offset, "critical"))
+
+        # Everything is overdue, so the longest waiting message goes first
+        first = scheduler.get(timeout=0)
+        assert first.priority_class == "low"
+        assert scheduler.get_stats()["classes"]["low"]["promoted"] == 1
+
+    def test_get_returns_none_when_empty(self):
+        assert make_scheduler().get(timeout=0) is None
+
+    def test_is_full_and_has_drained_give_hysteresis(self):
+        scheduler = make_scheduler(max_queue_size=4)
+        for offset in range(4):
+            assert not scheduler.is_full()
+            scheduler.put(make_message(offset))
+        assert scheduler.is_full()
+
+        # put never blocks, so a whole polled batch can be handed over
+        scheduler.put(make_message(4))
+        assert scheduler.qsize() == 5
+
+        drain(scheduler, 2)
+        assert not scheduler.is_full()
+        assert not scheduler.has_drained()
+        drain(scheduler, 1)
+        assert scheduler.has_drained()
+
+    def test_remove_drops_matching_messages_only(self):
+        scheduler = make_scheduler()
+        for offset in range(6):
+            scheduler.put(make_message(offset, "high" if offset % 2 else "low", partition=offset % 3))
+
+        removed = scheduler.remove(lambda message: message.partition == 0)
+        assert sorted(item.message.offset for item in removed) == [0, 3]
+        assert scheduler.qsize() == 4
+        remaining = drain(scheduler, 4)
+        assert all(item.message.partition != 0 for item in remaining)
+        assert scheduler.get(timeout=0) is None
+
+    def test_configure_updates_weights_and_keeps_queued_messages(self):
+        scheduler = make_scheduler(class_weights={"high": 1, "low": 1})
+        for offset in range(20):
+            scheduler.put(make_message(offset, "high" if offset < 10 else "info"))
+
+        scheduler.configure(class_weights={"high": 3, "urgent": 5}, max_wait_seconds=60.0, max_queue_size=10)
+
+        stats = scheduler.get_stats()
+        assert stats["classes"]["high"]["weight"] == 3
+        assert stats["classes"]["low"]["weight"] == 1
+        assert stats["classes"]["urgent"]["weight"] == 5
+        assert stats["max_wait_seconds"] == 60.0
+        assert scheduler.is_full()
+
+        served = Counter(item.priority_class for item in drain(scheduler, 8))
+        assert served == {"high": 6, "low": 2}
+        assert scheduler.qsize() == 12
@@ -0,0 +1,68 @@
+"""Tests for the fast tier's response parsing and statistics."""
+
+from src.tiered import FAST_TIER, PRIMARY_TIER, TierStats, parse_fast_tier_response
+
+GROUPS = {"group:default/payments", "group:default/rhdh"}
+
+
+class TestParseFastTierResponse:
+    def test_parses_a_plain_json_answer(self):
+        result = parse_fast_tier_response(
+            '{"summary": "Unknown event type.", "recipient": "group:default/payments", "confidence": 0.9}',
+            GROUPS
+        )
+        assert result.summary == "Unknown event type."
+        assert result.recipient == "group:default/payments"
+        assert result.confidence == 0.9
+
+    def test_ignores_text_around_the_object(self):
+        text = (
+            'Here you go: {"summary": "Missing type field.", "recipient": "", "confidence": 0.8}\n'
+            "Note: fields like {type} were missing."
+        )
+        result = parse_fast_tier_response(text, GROUPS)
+        assert result.summary == "Missing type field."
+        assert result.recipient is None
+
+    def test_strips_parentheses_copied_from_the_group_list(self):
+        result = parse_fast_tier_response(
+            '{"summary": "Bad schema.", "recipient": "(group:default/payments)", "confidence": 0.75}',
+            GROUPS
+        )
+        assert result.recipient == "group:default/payments"
+
+    def test_rejects_recipients_outside_the_catalog(self):
+        text = '{"summary": "Bad schema.", "recipient": "group:default/unknown", "confidence": 0.9}'
+        assert parse_fast_tier_response(text, GROUPS) is None
+
+    def test_rejects_malformed_answers(self):
+        for text in (
+            "I am not sure.",
+            '{"summary": "Cut off',
+            '["not", "an", "object"]',
+            '{"summary": "", "confidence": 0.9}',
+            '{"summary": "No confidence."}',
+            '{"summary": "Too sure.", "confidence": 1.5}',
+            '{"summary": "Not a number.", "confidence": "high"}',
+        ):
+            assert parse_fast_tier_response(text, GROUPS) is None, text
+
+
+class TestTierStats:
+    def test_fast_share_counts_resolved_against_escalated(self):
+        stats = TierStats()
+        for _ in range(3):
+            stats.record(FAST_TIER, 0.1)
+        stats.record_resolved()
+        stats.record_escalation("low_confidence")
+        stats.record_escalation("low_confidence")
+        stats.record(PRIMARY_TIER, 2.0)
+
+        result = stats.get_stats()
+        assert result["fast"] == {"messages": 3, "avg_latency_ms": 100.0}
+        assert result["primary"] == {"messages": 1, "avg_latency_ms": 2000.0}
+        assert result["escalations"] == {"low_confidence": 2}
+        assert result["fast_share"] == 0.333
+
+    def test_empty_stats(self):
+        assert TierStats().get_stats()["fast_share"] == 0.0
@@ -0,0 +1,80 @@
+"""Tests for the tracer and its in-memory exporters."""
+
+import pytest
+
+from src.tracing import RingBufferExporter, SlowTraceExporter, Span, Tracer
+
+
+def make_trace(name: str, duration_ms: float) -> Span:
+    return Span(name=name, trace_id="t" * 32, span_id="s" * 16, start_time=100.0,
+                end_time=100.0 + duration_ms / 1000)
+
+
+class TestRingBufferExporter:
+    def test_keeps_the_most_recent_traces_newest_first(self):
+        exporter = RingBufferExporter(size=3)
+        for index in range(5):
+            exporter.export(make_trace(f"trace-{index}", 1))
+
+        assert [root.name for root in exporter.get_traces()] == ["trace-4", "trace-3", "trace-2"]
+
+    def test_size_zero_keeps_nothing(self):
+        exporter = RingBufferExporter(size=0)
+        exporter.export(make_trace("trace", 1))
+        assert exporter.get_traces() == []
+
+
+class TestSlowTraceExporter:
+    def test_keeps_the_slowest_traces_slowest_first(self):
+        exporter = SlowTraceExporter(size=3)
+        for index, duration in enumerate([5, 50, 1, 20, 30, 2]):
+            exporter.export(make_trace(f"trace-{index}", duration))
+
+        assert [root.duration_ms for root in exporter.get_traces()] == [50.0, 30.0, 20.0]
+
+    def test_equal_durations_are_kept_without_comparing_spans(self):
+        exporter = SlowTraceExporter(size=2)
+        for index in range(3):
+            exporter.export(make_trace(f"trace-{index}", 10))
+
+        assert [root.name for root in exporter.get_traces()] == ["trace-1", "trace-0"]
+
+    def test_size_zero_keeps_nothing(self):
+        exporter = SlowTraceExporter(size=0)
+        exporter.export(make_trace("trace", 10))
+        assert exporter.get_traces() == []
+
+
+class TestTracer:
+    def test_spans_nest_under_the_current_span_and_traces_are_exported(self):
+        tracer = Tracer(buffer_size=10, slow_trace_count=10)
+        with tracer.trace("message.process") as root:
+            with tracer.span("agent.run"):
+                with tracer.span("llm.call") as span:
+                    span.set_attribute("llm.iteration", 1)
+            tracer.record_span("scheduler.wait", root, root.start_time - 1, root.start_time)
+
+        (trace,) = tracer.get_recent_traces()
+        assert [child["name"] for child in trace["children"]] == ["agent.run", "scheduler.wait"]
+        assert trace["children"][0]["children"][0]["attributes"] == {"llm.iteration": 1}
+        assert trace["children"][1]["duration_ms"] == 1000.0
+        assert tracer.get_slow_traces() == [trace]
+
+    def test_errors_are_recorded_and_reraised(self):
+        tracer = Tracer()
+        with pytest.raises(ValueError):
+            with tracer.trace("message.process"):
+                with tracer.span("agent.run"):
+                    raise ValueError("boom")
+
+        (trace,) = tracer.get_recent_traces()
+        assert trace["status"] == "error"
+        assert trace["children"][0]["attributes"]["error"] == "boom"
+
+    def test_spans_outside_a_trace_and_unsampled_traces_are_no_ops(self):
+        tracer = Tracer(sample_rate=0.0)
+        with tracer.span("agent.run") as span:
+            assert span is None
+        with tracer.trace("message.process") as root:
+            assert root is None
+        assert tracer.get_recent_traces() == []
@@ -0,0 +1,66 @@
+"""Tests for UsageTracker."""
+
+import time
+
+from src.usage import RunUsage, UsageTracker
+
+
+def run(topic: str, tokens: int, age_seconds: float = 0.0, recipients=()) -> RunUsage:
+    return RunUsage(
+        topic=topic, prompt_tokens=tokens - tokens // 4, completion_tokens=tokens // 4,
+        iterations=2, recipients=list(recipients), timestamp=time.time() - age_seconds
+    )
+
+
+class TestUsageTracker:
+    def test_runs_older_than_the_window_expire(self):
+        tracker = UsageTracker(window_seconds=60)
+        tracker.record(run("orders", 100, age_seconds=120))
+        tracker.record(run("orders", 40))
+
+        stats = tracker.get_stats()
+        assert stats["window"]["messages"] == 1
+        assert stats["window"]["total_tokens"] == 40
+        assert stats["lifetime"]["messages"] == 2
+        assert stats["lifetime"]["total_tokens"] == 140
+
+    def test_total_budget_applies_across_topics(self):
+        tracker = UsageTracker(window_seconds=60, token_budget=100)
+        tracker.record(run("orders", 60))
+        assert tracker.within_budget("payments")
+
+        tracker.record(run("payments", 40))
+        assert not tracker.within_budget("orders")
+        assert not tracker.within_budget("shipping")
+        assert tracker.get_stats()["budget"] == {
+            "tokens_per_window": 100,
+            "topic_tokens_per_window": 0,
+            "remaining": 0,
+            "over_budget_messages": 2,
+        }
+
+    def test_topic_budget_only_limits_that_topic(self):
+        tracker = UsageTracker(window_seconds=60, topic_token_budget=50)
+        tracker.record(run("orders", 50))
+
+        assert not tracker.within_budget("orders")
+        assert tracker.within_budget("payments")
+
+    def test_budget_frees_up_as_runs_expire(self):
+        tracker = UsageTracker(window_seconds=60, token_budget=100)
+        tracker.record(run("orders", 100, age_seconds=59.9))
+        assert not tracker.within_budget("orders")
+
+        tracker.window_seconds = 30
+        assert tracker.within_budget("orders")
+
+    def test_runs_count_towards_each_recipient_once(self):
+        tracker = UsageTracker(window_seconds=60)
+        tracker.record(run("orders", 80, recipients=["group:default/rhdh", "group:default/payments",
+                                                    "group:default/rhdh"]))
+        tracker.record(run("orders", 20, recipients=["group:default/rhdh"]))
+
+        stats = tracker.get_stats()
+        assert stats["by_topic"]["orders"]["total_tokens"] == 100
+        assert stats["by_recipient"]["group:default/rhdh"]["messages"] == 2
+        assert stats["by_recipient"]["group:default/payments"]["total_tokens"] == 80